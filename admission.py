@@ -0,0 +1,116 @@
+"""Per-endpoint admission control.
+
+Each limited endpoint gets at most `limit` concurrent requests per process.
+Up to `queue_size` more wait for a slot, each for at most `timeout`
+seconds; anything beyond that, or a waiter that times out, is rejected
+straight away with a 503 and Retry-After instead of piling up on the
+database pool. Endpoints without a limit are never held back.
+"""
+import threading
+
+from flask import g, request
+
+
+class _Gate(object):
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            self.queued += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.limit, timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControl(object):
+    def __init__(self, app=None):
+        self.gates = {}
+        self.timeout = 0.5
+        self.retry_after = 1
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        queue_size = app.config.get('ADMISSION_QUEUE_SIZE', 16)
+        self.gates = {
+            endpoint: _Gate(limit, queue_size)
+            for endpoint, limit in app.config.get('ADMISSION_LIMITS', {}).items()
+        }
+        self.timeout = app.config.get('ADMISSION_QUEUE_TIMEOUT', 0.5)
+        self.retry_after = app.config.get('ADMISSION_RETRY_AFTER', 1)
+        app.before_request(self._admit)
+        app.after_request(self._release_on_close)
+        app.teardown_request(self._release)
+
+    def _admit(self):
+        gate = self.gates.get(request.endpoint)
+        if gate is None:
+            return None
+        if not gate.acquire(self.timeout):
+            return 'Server busy, please retry.', 503, {
+                'Retry-After': str(self.retry_after),
+                'Content-Type': 'text/plain; charset=utf-8',
+            }
+        g.admission_gate = gate
+        return None
+
+    def _release_on_close(self, response):
+        # Streamed pages hold the slot until the WSGI server closes the
+        # response: after the last chunk, or when the client disconnects
+        # mid-stream. Teardown alone misses the latter while the request
+        # context is preserved (PRESERVE_CONTEXT_ON_EXCEPTION, on in debug).
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            response.call_on_close(gate.release)
+        return response
+
+    def _release(self, exc=None):
+        # teardown_request: only reached with the gate still set when no
+        # response went through after_request, e.g. an exception propagated.
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            gate.release()
+
+    def stats(self):
+        return {endpoint: gate.stats() for endpoint, gate in self.gates.items()}
+
+
+admission = AdmissionControl()
@@ -2,17 +2,31 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
-from flask_moment import Moment
+import os
+import json
+import hashlib
+import mimetypes
+import time
+import threading
+import click
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, stream_with_context, \
+  send_from_directory, safe_join, jsonify, abort
 import logging
 from logging import Formatter, FileHandler
-from sqlalchemy import and_
-from forms import *
-from flask_migrate import Migrate
+import jinja2
+from jinja2 import FileSystemBytecodeCache
 from datetime import datetime
 from model import db, Venue, Show, Artist
+from cache import cache
+from jobs import jobs
+from admission import admission
+from statements import statements
+from assets import BUNDLES, Manifest, build as build_assets
+from compression import CompressionMiddleware
+from autocomplete import ChangeLog, PrefixIndex
+
+# Forms (flask_wtf), Babel, dateutil and Flask-Migrate are imported where they
+# are used so that workers and CLI commands only pay for what they touch.
 
 # from models import db, Venue, Artist, Show
 
@@ -21,123 +35,374 @@ from model import db, Venue, Show, Artist
 #----------------------------------------------------------------------------#
 
 app = Flask(__name__)
-moment = Moment(app)
 app.config.from_object('config')
 db.init_app(app)
-migrate = Migrate(app, db)
+cache.init_app(app)
+jobs.init_app(app)
+admission.init_app(app)
+statements.init_app(app)
+
+if app.config.get('SQLITE_IN_MEMORY'):
+  with app.app_context():
+    db.create_all()
+
+def running_migrations():
+  # The `flask db` group is registered by Flask-Migrate's entry point and
+  # loads the app from inside the click context.
+  ctx = click.get_current_context(silent=True)
+  return ctx is not None and ctx.find_root().invoked_subcommand == 'db'
+
+if running_migrations():
+  from flask_migrate import Migrate
+  migrate = Migrate(app, db)
+
+# Listing pages repeat one tile per row: drop the template indentation and
+# compress what goes on the wire.
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
+
+# Compiled templates persist across worker restarts; see `flask precompile-templates`.
+# Cache files are keyed on the options that change the compiled code, since
+# Jinja itself only checks the template source.
+if app.config.get('JINJA_BYTECODE_CACHE_DIR'):
+  os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+  bytecode_tag = hashlib.sha1(repr(
+    (jinja2.__version__, app.jinja_env.trim_blocks, app.jinja_env.lstrip_blocks)
+  ).encode()).hexdigest()[:8]
+  app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+    app.config['JINJA_BYTECODE_CACHE_DIR'], pattern=f'__jinja2_{bytecode_tag}_%s.cache'
+  )
+
+asset_manifest = Manifest(app.config['ASSETS_DIST_DIR'])
+
+# Name indexes for the autocomplete endpoints and the id lookups behind
+# ShowForm: loaded with one projected query on first use and kept current by
+# the create/edit/delete handlers, which also publish their changes to a
+# change log in the cache. Other processes sharing the cache apply those on
+# next use; reloads (log gaps, AUTOCOMPLETE_MAX_AGE) run in the background.
+def spawn_index_build(build):
+  # Threads like the jobs "thread" backend; inline where jobs run inline
+  # (in-memory SQLite shares one connection).
+  if app.config['JOBS_BACKEND'] == 'inline':
+    build()
+    return
+
+  def run():
+    with app.app_context():
+      build()
+  threading.Thread(target=run, name='name-index-build', daemon=True).start()
+
+artist_names = PrefixIndex(Artist.id_name_pairs, fetch=Artist.name_for_id,
+                           changelog=ChangeLog(cache, 'artist_names'),
+                           max_age=app.config['AUTOCOMPLETE_MAX_AGE'], spawn=spawn_index_build)
+venue_names = PrefixIndex(Venue.id_name_pairs, fetch=Venue.name_for_id,
+                          changelog=ChangeLog(cache, 'venue_names'),
+                          max_age=app.config['AUTOCOMPLETE_MAX_AGE'], spawn=spawn_index_build)
+
+if app.config.get('COMPRESSION_ENABLED'):
+  app.wsgi_app = CompressionMiddleware(
+    app.wsgi_app,
+    min_size=app.config['COMPRESSION_MIN_SIZE'],
+    level=app.config['COMPRESSION_LEVEL'],
+    brotli_quality=app.config['COMPRESSION_BROTLI_QUALITY'],
+  )
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
+  from babel.dates import format_datetime as babel_format_datetime
+  try:
+    # Fast path for the "%Y-%m-%d %H:%M:%S" strings built by the controllers.
+    date = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+  except ValueError:
+    import dateutil.parser
+    date = dateutil.parser.parse(value)
   if format == 'full':
       format="EEEE MMMM, d, y 'at' h:mma"
   elif format == 'medium':
       format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+  return babel_format_datetime(date, format, locale='en')
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def stream_template(template_name, **context):
+  # Render through Jinja's streaming API so the layout head goes out before
+  # the rows are fetched; context may hold lazy row generators.
+  app.update_template_context(context)
+  template = app.jinja_env.get_template(template_name)
+  stream = template.stream(context)
+  stream.enable_buffering(app.config.get('TEMPLATE_STREAM_BUFFER', 32))
+  return Response(stream_with_context(stream), mimetype='text/html')
+
+@cache.memoize()
+def venue_detail(venue_id):
+    v = Venue.query.get(venue_id)
+    if v is None:
+        return None
+    # One JOIN Show -> Artist, split into past and upcoming here.
+    past_rows, upcoming_rows = Show.split_past_upcoming(Show.for_venue(venue_id))
+
+    past = [{
+        "artist_id": artist_id,
+        "artist_name": name,
+        "artist_image_link": image_link,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")
+    } for (start_time, artist_id, name, image_link) in past_rows]
+
+    upcoming = [{
+        "artist_id": artist_id,
+        "artist_name": name,
+        "artist_image_link": image_link,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")
+    } for (start_time, artist_id, name, image_link) in upcoming_rows]
+
+    data = {
+        "id": v.id,
+        "name": v.name,
+        "genres": v.genres,
+        "address": v.address,
+        "city": v.city,
+        "state": v.state,
+        "phone": v.phone,
+        "website": v.website_link,
+        "facebook_link": v.facebook_link,
+        "seeking_talent": v.seeking_talent,
+        "seeking_description": v.seeking_description,
+        "image_link": v.image_link,
+        "past_shows": past,
+        "upcoming_shows": upcoming,
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+    }
+    return data
+
+@cache.memoize()
+def artist_detail(artist_id):
+    a = Artist.query.get(artist_id)
+    if a is None:
+        return None
+    past_rows, upcoming_rows = Show.split_past_upcoming(Show.for_artist(artist_id))
+
+    past = [{
+        "venue_id": venue_id,
+        "venue_name": name,
+        "venue_image_link": image_link,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")
+    } for (start_time, venue_id, name, image_link) in past_rows]
+
+    upcoming = [{
+        "venue_id": venue_id,
+        "venue_name": name,
+        "venue_image_link": image_link,
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S")
+    } for (start_time, venue_id, name, image_link) in upcoming_rows]
+
+    data = {
+        "id": a.id,
+        "name": a.name,
+        "genres": a.genres,
+        "city": a.city,
+        "state": a.state,
+        "phone": a.phone,
+        "website": a.website_link,
+        "facebook_link": a.facebook_link,
+        "seeking_venue": a.seeking_venue,
+        "seeking_description": a.seeking_description,
+        "image_link": a.image_link,
+        "past_shows": past,
+        "upcoming_shows": upcoming,
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+    }
+    return data
+
+# Detail dicts and counts are cached for CACHE_DEFAULT_TTL seconds. Writes
+# drop the entries they directly affect right away (so the redirect after a
+# write reads fresh data) and leave recomputing them to a background job.
+# Deletes also drop the entries of the other side of the deleted shows;
+# renamed names shown on another entity's page may lag by up to the TTL.
+# The hooks run after the write has committed, so a failing cache backend is
+# logged rather than reported to the user as a failed write.
+def venue_changed(venue_id, names=False):
+  try:
+    if names:
+      venue_names.publish()
+    cache.delete_memoized(venue_detail, venue_id)
+    cache.delete_memoized(Show.upcoming_count_for_venue, venue_id)
+    cache.bump('venue_summaries')
+    jobs.enqueue('refresh_venue', venue_id)
+    jobs.enqueue('refresh_home_feed')
+  except Exception:
+    app.logger.exception('Could not invalidate cached data for venue %s', venue_id)
+
+def artist_changed(artist_id, names=False):
+  try:
+    if names:
+      artist_names.publish()
+    cache.delete_memoized(artist_detail, artist_id)
+    cache.delete_memoized(Show.upcoming_count_for_artist, artist_id)
+    cache.bump('artist_summaries')
+    jobs.enqueue('refresh_artist', artist_id)
+    jobs.enqueue('refresh_home_feed')
+  except Exception:
+    app.logger.exception('Could not invalidate cached data for artist %s', artist_id)
+
+@jobs.task
+def refresh_venue(venue_id):
+  venue_detail(venue_id)
+  Show.upcoming_count_for_venue(venue_id)
+
+@jobs.task
+def refresh_artist(artist_id):
+  artist_detail(artist_id)
+  Show.upcoming_count_for_artist(artist_id)
+
+# The home page feed is built once and then only replaced: by a job after
+# writes (coalesced, so a burst of writes rebuilds it once) and when it is
+# older than HOME_FEED_MAX_AGE, which also picks up writes made by other
+# processes. Requests always get the current copy and never wait on a
+# rebuild, so the home page costs no queries once the feed exists.
+def build_home_feed():
+  size = app.config['HOME_FEED_SIZE']
+  return {
+    "recent_venues": Venue.recent(size),
+    "recent_artists": Artist.recent(size),
+    "trending_venues": Venue.trending(size),
+    "built_at": time.time(),
+  }
+
+def home_feed():
+  feed = cache.get_or_compute('home_feed', build_home_feed, ttl=0)
+  if time.time() - feed["built_at"] > app.config['HOME_FEED_MAX_AGE']:
+    jobs.enqueue('refresh_home_feed')
+  return feed
+
+@jobs.task
+def refresh_home_feed():
+  cache.set('home_feed', build_home_feed(), ttl=0)
+
+# Batch summaries are cached per set of ids. A write can touch any number of
+# sets, so rather than tracking them every write bumps the version that is
+# part of their keys.
+@cache.memoize()
+def venue_summaries(ids, version):
+  return Venue.summaries(ids)
+
+@cache.memoize()
+def artist_summaries(ids, version):
+  return Artist.summaries(ids)
+
+def batch_response(summaries, namespace):
+  # ?ids=1,2,3 (or repeated ids=); summaries come back in the order asked.
+  try:
+    ids = [int(id) for value in request.args.getlist('ids') for id in value.split(',') if id.strip()]
+  except ValueError:
+    return jsonify({"error": "ids must be integers"}), 400
+  ids = list(dict.fromkeys(ids))
+  if len(ids) > app.config['BATCH_MAX_IDS']:
+    return jsonify({"error": f"at most {app.config['BATCH_MAX_IDS']} ids per request"}), 400
+  found = summaries(tuple(sorted(ids)), cache.version(namespace)) if ids else {}
+  response = jsonify({
+    "data": [found[id] for id in ids if id in found],
+    "missing": [id for id in ids if id not in found],
+  })
+  response.cache_control.public = True
+  response.cache_control.max_age = app.config['BATCH_MAX_AGE']
+  response.add_etag()
+  return response.make_conditional(request)
+
+@app.template_global()
+def asset_url_for(filename):
+  # Fingerprinted copy from `flask build-assets` if there is one.
+  hashed = asset_manifest.get(filename)
+  if hashed is None:
+    return url_for('static', filename=filename)
+  return url_for('dist_asset', filename=hashed)
+
+@app.template_global()
+def bundle_urls(name):
+  if asset_manifest.get(name) is not None:
+    return [asset_url_for(name)]
+  return [url_for('static', filename=path) for path in BUNDLES[name]]
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
 @app.route('/')
 def index():
-  return render_template('pages/home.html')
+  return render_template('pages/home.html', feed=home_feed())
+
+#  Assets
+#  ----------------------------------------------------------------
+
+@app.route('/assets/<path:filename>')
+def dist_asset(filename):
+  # Fingerprinted files never change, so they can be cached "forever";
+  # serve the precompressed variant the client accepts.
+  dist_dir = app.config['ASSETS_DIST_DIR']
+  served, encoding = filename, None
+  for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+    if request.accept_encodings[candidate] and os.path.isfile(safe_join(dist_dir, filename + suffix)):
+      served, encoding = filename + suffix, candidate
+      break
+  response = send_from_directory(
+    dist_dir, served,
+    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+    cache_timeout=app.config['ASSETS_MAX_AGE'],
+  )
+  if encoding:
+    response.headers['Content-Encoding'] = encoding
+  response.vary.add('Accept-Encoding')
+  response.headers['Cache-Control'] = f"public, max-age={app.config['ASSETS_MAX_AGE']}, immutable"
+  return response
 
 #  Venues
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
 def venues():
-  data = []
-  rows = db.session.query(Venue.city, Venue.state).distinct().all()
-  now = datetime.utcnow()
-  for city, state in rows:
-    venues_in_area = Venue.query.filter_by(city=city, state=state).order_by(Venue.name).all()
-    items = []
-    for v in venues_in_area:
-      upcoming = Show.query.filter(Show.venue_id == v.id, Show.start_time > now).count()
-      items.append({"id": v.id, "name": v.name, "num_upcoming_shows": upcoming})
-    data.append({"city": city, "state": state, "venues": items})
-  return render_template('pages/venues.html', areas=data)
+  return stream_template('pages/venues.html', areas=Venue.iter_by_area())
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
   term = request.form.get('search_term', '')
-  results = Venue.query.filter(Venue.name.ilike(f"%{term}%")).all()
-  now = datetime.utcnow()
+  results = Venue.search_by_name(term)
   response = {
     "count": len(results),
     "data": [
       {
-        "id": v.id,
-        "name": v.name,
-        "num_upcoming_shows": Show.query.filter(Show.venue_id == v.id, Show.start_time > now).count()
-      } for v in results
+        "id": venue_id,
+        "name": name,
+        "num_upcoming_shows": Show.upcoming_count_for_venue(venue_id)
+      } for venue_id, name in results
     ]
   }
   return render_template('pages/search_venues.html', results=response, search_term=term)
 
 
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-    v = Venue.query.get_or_404(venue_id)
-    now = datetime.utcnow()
-
-    # Past shows (JOIN Show -> Artist)
-    past_rows = (
-        db.session.query(Show, Artist)
-        .join(Artist, Show.artist_id == Artist.id)
-        .filter(and_(Show.venue_id == venue_id, Show.start_time <= now))
-        .order_by(Show.start_time.desc())
-        .all()
-    )
+@app.route('/venues/autocomplete')
+def autocomplete_venues():
+  limit = max(1, min(request.args.get('limit', 10, type=int), app.config['AUTOCOMPLETE_MAX_RESULTS']))
+  return jsonify({"data": venue_names.search(request.args.get('q', ''), limit)})
 
-    # Upcoming shows (JOIN Show -> Artist)
-    upcoming_rows = (
-        db.session.query(Show, Artist)
-        .join(Artist, Show.artist_id == Artist.id)
-        .filter(and_(Show.venue_id == venue_id, Show.start_time > now))
-        .order_by(Show.start_time.asc())
-        .all()
-    )
 
-    past = [{
-        "artist_id": a.id,
-        "artist_name": a.name,
-        "artist_image_link": a.image_link,
-        "start_time": s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-    } for (s, a) in past_rows]
+@app.route('/venues/batch')
+def batch_venues():
+  return batch_response(venue_summaries, 'venue_summaries')
 
-    upcoming = [{
-        "artist_id": a.id,
-        "artist_name": a.name,
-        "artist_image_link": a.image_link,
-        "start_time": s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-    } for (s, a) in upcoming_rows]
 
-    data = {
-        "id": v.id,
-        "name": v.name,
-        "genres": v.genres,
-        "address": v.address,
-        "city": v.city,
-        "state": v.state,
-        "phone": v.phone,
-        "website": v.website_link,
-        "facebook_link": v.facebook_link,
-        "seeking_talent": v.seeking_talent,
-        "seeking_description": v.seeking_description,
-        "image_link": v.image_link,
-        "past_shows": past,
-        "upcoming_shows": upcoming,
-        "past_shows_count": len(past),
-        "upcoming_shows_count": len(upcoming),
-    }
+@app.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    data = venue_detail(venue_id)
+    if data is None:
+        abort(404)
     return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
@@ -145,11 +410,13 @@ def show_venue(venue_id):
 
 @app.route('/venues/create', methods=['GET'])
 def create_venue_form():
+  from forms import VenueForm
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission():
+  from forms import VenueForm
   form = VenueForm()
   if not form.validate_on_submit():
     flash('Please fix form errors and try again.')
@@ -172,12 +439,16 @@ def create_venue_submission():
     )
     db.session.add(v)
     db.session.commit()
-    flash(f'Venue {v.name} was successfully listed!')
+    venue_id, name = v.id, v.name
   except Exception:
     db.session.rollback()
     flash('An error occurred. Venue could not be listed.')
+    return redirect(url_for('venues'))
   finally:
     db.session.close()
+  venue_names.add(venue_id, name)
+  venue_changed(venue_id, names=True)
+  flash(f'Venue {name} was successfully listed!')
   return redirect(url_for('venues'))
 
 
@@ -189,16 +460,23 @@ def delete_venue(venue_id):
   # clicking that button delete it from the db then redirect the user to the homepages
   venue = Venue.query.get_or_404(venue_id)
   try:
+      # The shows go with the venue; their artists' pages and counts change too.
+      artist_ids = {show.artist_id for show in venue.shows}
+      venue_id, name = venue.id, venue.name
       db.session.delete(venue)
       db.session.commit()
-      flash(f'Venue {venue.name} was successfully deleted.')
-      return '', 204  # useful for fetch() calls
   except Exception:
       db.session.rollback()
       flash('An error occurred. Venue could not be deleted.')
       return '', 500
   finally:
       db.session.close()
+  venue_names.remove(venue_id)
+  venue_changed(venue_id, names=True)
+  for artist_id in artist_ids:
+    artist_changed(artist_id)
+  flash(f'Venue {name} was successfully deleted.')
+  return '', 204  # useful for fetch() calls
 
 #  Artists
 #  ----------------------------------------------------------------
@@ -211,77 +489,41 @@ def artists():
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
   term = request.form.get('search_term', '')
-  results = Artist.query.filter(Artist.name.ilike(f"%{term}%")).all()
-  now = datetime.utcnow()
+  results = Artist.search_by_name(term)
   response = {
     "count": len(results),
     "data": [{
-      "id": a.id,
-      "name": a.name,
-      "num_upcoming_shows": Show.query.filter(Show.artist_id == a.id, Show.start_time > now).count()
-    } for a in results]
+      "id": artist_id,
+      "name": name,
+      "num_upcoming_shows": Show.upcoming_count_for_artist(artist_id)
+    } for artist_id, name in results]
   }
   return render_template('pages/search_artists.html', results=response, search_term=term)
 
 
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    a = Artist.query.get_or_404(artist_id)
-    now = datetime.utcnow()
-
-    past_rows = (
-        db.session.query(Show, Venue)
-        .join(Venue, Show.venue_id == Venue.id)
-        .filter(and_(Show.artist_id == artist_id, Show.start_time <= now))
-        .order_by(Show.start_time.desc())
-        .all()
-    )
+@app.route('/artists/autocomplete')
+def autocomplete_artists():
+  limit = max(1, min(request.args.get('limit', 10, type=int), app.config['AUTOCOMPLETE_MAX_RESULTS']))
+  return jsonify({"data": artist_names.search(request.args.get('q', ''), limit)})
 
-    upcoming_rows = (
-        db.session.query(Show, Venue)
-        .join(Venue, Show.venue_id == Venue.id)
-        .filter(and_(Show.artist_id == artist_id, Show.start_time > now))
-        .order_by(Show.start_time.asc())
-        .all()
-    )
 
-    past = [{
-        "venue_id": v.id,
-        "venue_name": v.name,
-        "venue_image_link": v.image_link,
-        "start_time": s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-    } for (s, v) in past_rows]
+@app.route('/artists/batch')
+def batch_artists():
+  return batch_response(artist_summaries, 'artist_summaries')
 
-    upcoming = [{
-        "venue_id": v.id,
-        "venue_name": v.name,
-        "venue_image_link": v.image_link,
-        "start_time": s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-    } for (s, v) in upcoming_rows]
 
-    data = {
-        "id": a.id,
-        "name": a.name,
-        "genres": a.genres,
-        "city": a.city,
-        "state": a.state,
-        "phone": a.phone,
-        "website": a.website_link,
-        "facebook_link": a.facebook_link,
-        "seeking_venue": a.seeking_venue,
-        "seeking_description": a.seeking_description,
-        "image_link": a.image_link,
-        "past_shows": past,
-        "upcoming_shows": upcoming,
-        "past_shows_count": len(past),
-        "upcoming_shows_count": len(upcoming),
-    }
+@app.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    data = artist_detail(artist_id)
+    if data is None:
+        abort(404)
     return render_template('pages/show_artist.html', artist=data)
 
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
+    from forms import ArtistForm
     form = ArtistForm()
     artist = Artist.query.get_or_404(artist_id)
 
@@ -292,6 +534,7 @@ def edit_artist(artist_id):
 def edit_artist_submission(artist_id):
   # TODO: take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
+  from forms import ArtistForm
   form = ArtistForm()
   artist = Artist.query.get_or_404(artist_id)
 
@@ -313,17 +556,22 @@ def edit_artist_submission(artist_id):
       artist.genres = form.genres.data  # list stays list/ARRAY
 
       db.session.commit()
-      flash(f'Artist {artist.name} was successfully updated!')
+      name = artist.name
   except Exception:
       db.session.rollback()
       flash('An error occurred. Artist could not be updated.')
+      return redirect(url_for('show_artist', artist_id=artist_id))
   finally:
       db.session.close()
+  artist_names.add(artist_id, name)
+  artist_changed(artist_id, names=True)
+  flash(f'Artist {name} was successfully updated!')
 
   return redirect(url_for('show_artist', artist_id=artist_id))
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
+    from forms import VenueForm
     form = VenueForm()
     venue = Venue.query.get_or_404(venue_id)
 
@@ -334,6 +582,7 @@ def edit_venue(venue_id):
 def edit_venue_submission(venue_id):
   # TODO: take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
+  from forms import VenueForm
   form = VenueForm()
   venue = Venue.query.get_or_404(venue_id)
 
@@ -356,12 +605,16 @@ def edit_venue_submission(venue_id):
       venue.genres = form.genres.data  # list/ARRAY
 
       db.session.commit()
-      flash(f'Venue {venue.name} was successfully updated!')
+      name = venue.name
   except Exception:
       db.session.rollback()
       flash('An error occurred. Venue could not be updated.')
+      return redirect(url_for('show_venue', venue_id=venue_id))
   finally:
       db.session.close()
+  venue_names.add(venue_id, name)
+  venue_changed(venue_id, names=True)
+  flash(f'Venue {name} was successfully updated!')
 
   return redirect(url_for('show_venue', venue_id=venue_id))
 
@@ -370,12 +623,14 @@ def edit_venue_submission(venue_id):
 
 @app.route('/artists/create', methods=['GET'])
 def create_artist_form():
+  from forms import ArtistForm
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
 
 @app.route('/artists/create', methods=['POST'])
 def create_artist_submission():
+  from forms import ArtistForm
   form = ArtistForm()
   if not form.validate_on_submit():
     flash('Please fix form errors and try again.')
@@ -397,28 +652,39 @@ def create_artist_submission():
     )
     db.session.add(a)
     db.session.commit()
-    flash(f'Artist {a.name} was successfully listed!')
+    artist_id, name = a.id, a.name
   except Exception:
     db.session.rollback()
     flash('An error occurred. Artist could not be listed.')
+    return redirect(url_for('artists'))
   finally:
     db.session.close()
+  artist_names.add(artist_id, name)
+  artist_changed(artist_id, names=True)
+  flash(f'Artist {name} was successfully listed!')
   return redirect(url_for('artists'))
 
 @app.route('/artists/<int:artist_id>', methods=['DELETE'])
 def delete_artist(artist_id):
   artist = Artist.query.get_or_404(artist_id)
   try:
+    # The shows go with the artist; their venues' pages and counts change too.
+    venue_ids = {show.venue_id for show in artist.shows}
+    name = artist.name
     db.session.delete(artist)
     db.session.commit()
-    flash(f'Artist {artist.name} was successfully deleted.')
-    return '', 204
   except Exception:
     db.session.rollback()
     flash('An error occurred. Artist could not be deleted.')
     return '', 500
   finally:
     db.session.close()
+  artist_names.remove(artist_id)
+  artist_changed(artist_id, names=True)
+  for venue_id in venue_ids:
+    venue_changed(venue_id)
+  flash(f'Artist {name} was successfully deleted.')
+  return '', 204
 
 
 #  Shows
@@ -426,26 +692,19 @@ def delete_artist(artist_id):
 
 @app.route('/shows')
 def shows():
-  shows = Show.query.order_by(Show.start_time.desc()).all()
-  data = [{
-    "venue_id": s.venue.id,
-    "venue_name": s.venue.name,
-    "artist_id": s.artist.id,
-    "artist_name": s.artist.name,
-    "artist_image_link": s.artist.image_link,
-    "start_time": s.start_time.strftime("%Y-%m-%d %H:%M:%S")
-  } for s in shows]
-  return render_template('pages/shows.html', shows=data)
+  return stream_template('pages/shows.html', shows=Show.iter_listing())
 
 @app.route('/shows/create', methods=['GET'])
 def create_shows():
-  form = ShowForm()
+  from forms import ShowForm
+  form = ShowForm(artists=artist_names, venues=venue_names)
   return render_template('forms/new_show.html', form=form)
 
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-  form = ShowForm()
+  from forms import ShowForm
+  form = ShowForm(artists=artist_names, venues=venue_names)
   if not form.validate_on_submit():
     flash('Please fix form errors and try again.')
     flash(str(form.errors))
@@ -459,14 +718,61 @@ def create_show_submission():
     )
     db.session.add(s)
     db.session.commit()
-    flash('Show was successfully listed!')
+    artist_id, venue_id = s.artist_id, s.venue_id
   except Exception:
     db.session.rollback()
     flash('An error occurred. Show could not be listed.')
+    return redirect(url_for('shows'))
   finally:
     db.session.close()
+  artist_changed(artist_id)
+  venue_changed(venue_id)
+  flash('Show was successfully listed!')
   return redirect(url_for('shows'))
 
+#  Metrics
+#  ----------------------------------------------------------------
+
+@app.route('/metrics')
+def metrics():
+  # Per-process counters.
+  return jsonify({
+    "cache": cache.stats(),
+    "jobs": jobs.stats(),
+    "admission": admission.stats(),
+    "statements": statements.stats(),
+  })
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('precompile-templates')
+def precompile_templates():
+  """Compile every template into the Jinja bytecode cache."""
+  if app.jinja_env.bytecode_cache is None:
+    raise click.ClickException('JINJA_BYTECODE_CACHE_DIR is not configured.')
+  names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+  for name in names:
+    app.jinja_env.get_template(name)
+  click.echo(f'Precompiled {len(names)} templates into {app.config["JINJA_BYTECODE_CACHE_DIR"]}')
+
+@app.cli.command('jobs-worker')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def jobs_worker(burst):
+  """Drain the persistent job queue (JOBS_BACKEND=sqlite)."""
+  if app.config['JOBS_BACKEND'] != 'sqlite':
+    raise click.ClickException('jobs-worker needs JOBS_BACKEND=sqlite; other backends run in the web process.')
+  jobs.work(burst=burst)
+  click.echo(json.dumps(jobs.stats()))
+
+@app.cli.command('build-assets')
+def build_assets_command():
+  """Bundle, fingerprint and precompress the static assets."""
+  manifest = build_assets(app.static_folder, app.config['ASSETS_DIST_DIR'], app.static_url_path)
+  for name, hashed in sorted(manifest.items()):
+    click.echo(f'{name} -> {hashed}')
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -476,15 +782,29 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
+def preload():
+    """Import the lazily loaded modules up front.
+
+    Called at import time when PRELOAD_MODULES is set, e.g. in a preforking
+    master (gunicorn --preload) so that workers inherit them already loaded.
+    """
+    import forms  # noqa: F401
+    import dateutil.parser  # noqa: F401
+    from babel import Locale
+    Locale.parse('en').datetime_formats  # loads the 'en' locale data
+
+if app.config.get('PRELOAD_MODULES'):
+    preload()
+
 if not app.debug:
-    file_handler = FileHandler('error.log')
+    # delay=True: the log file is only opened once something is logged.
+    file_handler = FileHandler('error.log', delay=True)
     file_handler.setFormatter(
         Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
 
 #----------------------------------------------------------------------------#
 # Launch.
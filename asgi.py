@@ -0,0 +1,258 @@
+"""Optional asyncio read service for high-concurrency JSON reads.
+
+A plain ASGI app next to the Flask one: same models and statements
+(model.py), but queried through SQLAlchemy's asyncio extension with
+asyncpg, so one process keeps many requests waiting on PostgreSQL at
+once. Independent queries of a request run concurrently, each on its own
+pooled connection, via asyncio.gather. Writes stay with the Flask app.
+
+  pip install asyncpg uvicorn
+  uvicorn asgi:app --workers 4
+
+GET routes, all JSON:
+
+  /venues                   venues grouped by city/state with upcoming counts
+  /artists                  id and name of every artist
+  /venues/<id>              same data as the venue page
+  /artists/<id>             same data as the artist page
+  /venues/batch?ids=1,2     summaries, as /venues/batch in app.py
+  /artists/batch?ids=1,2
+
+asyncpg prepares and caches statements per connection by itself, so the
+hot statements are parsed and planned once per connection here as well.
+"""
+import asyncio
+import json
+import re
+from datetime import datetime
+from itertools import groupby
+from urllib.parse import parse_qs
+
+from sqlalchemy import and_, bindparam, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import config
+from model import (
+    Artist, Show, Venue,
+    ARTIST_SUMMARIES, SHOWS_FOR_ARTIST, SHOWS_FOR_VENUE, UPCOMING_COUNTS_FOR_ARTISTS,
+    UPCOMING_COUNTS_FOR_VENUES, VENUE_SUMMARIES,
+)
+
+
+def database_url():
+    if config.ASYNC_DATABASE_URL:
+        return config.ASYNC_DATABASE_URL
+    url = make_url(config.SQLALCHEMY_DATABASE_URI)
+    if url.get_backend_name() != 'postgresql':
+        raise RuntimeError('Set ASYNC_DATABASE_URL for databases other than PostgreSQL.')
+    return url.set(drivername='postgresql+asyncpg')
+
+
+engine = None
+
+
+def get_engine():
+    # Created on first use, inside the server's event loop.
+    global engine
+    if engine is None:
+        url = make_url(database_url())
+        options = {}
+        if url.get_backend_name() == 'postgresql':
+            options.update(pool_size=config.ASYNC_POOL_SIZE, max_overflow=config.ASYNC_POOL_OVERFLOW)
+        engine = create_async_engine(url, **options)
+    return engine
+
+
+async def fetch(stmt, **params):
+    async with get_engine().connect() as conn:
+        return (await conn.execute(stmt, params)).all()
+
+
+def format_time(start_time):
+    return start_time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+#  Queries
+#  ----------------------------------------------------------------
+
+VENUE_COLUMNS = (
+    Venue.id, Venue.name, Venue.genres, Venue.address, Venue.city, Venue.state, Venue.phone,
+    Venue.website_link, Venue.facebook_link, Venue.seeking_talent, Venue.seeking_description, Venue.image_link,
+)
+ARTIST_COLUMNS = (
+    Artist.id, Artist.name, Artist.genres, Artist.city, Artist.state, Artist.phone,
+    Artist.website_link, Artist.facebook_link, Artist.seeking_venue, Artist.seeking_description, Artist.image_link,
+)
+VENUE_BY_ID = select(*VENUE_COLUMNS).where(Venue.id == bindparam('id'))
+ARTIST_BY_ID = select(*ARTIST_COLUMNS).where(Artist.id == bindparam('id'))
+
+
+def areas_statement(now):
+    return (
+        select(Venue.city, Venue.state, Venue.id, Venue.name, func.count(Show.id))
+        .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > now))
+        .group_by(Venue.id)
+        .order_by(Venue.city, Venue.state, Venue.name)
+    )
+
+
+#  Handlers
+#  ----------------------------------------------------------------
+
+async def venue_detail(venue_id):
+    venue, shows = await asyncio.gather(fetch(VENUE_BY_ID, id=venue_id), fetch(SHOWS_FOR_VENUE.stmt, venue_id=venue_id))
+    if not venue:
+        return None
+    (id, name, genres, address, city, state, phone, website, facebook_link,
+     seeking_talent, seeking_description, image_link) = venue[0]
+    past, upcoming = Show.split_past_upcoming(shows)
+    show_dicts = [[{
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": format_time(start_time),
+    } for start_time, artist_id, artist_name, artist_image_link in rows] for rows in (past, upcoming)]
+    return {
+        "id": id,
+        "name": name,
+        "genres": genres,
+        "address": address,
+        "city": city,
+        "state": state,
+        "phone": phone,
+        "website": website,
+        "facebook_link": facebook_link,
+        "seeking_talent": seeking_talent,
+        "seeking_description": seeking_description,
+        "image_link": image_link,
+        "past_shows": show_dicts[0],
+        "upcoming_shows": show_dicts[1],
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+    }
+
+
+async def artist_detail(artist_id):
+    artist, shows = await asyncio.gather(fetch(ARTIST_BY_ID, id=artist_id), fetch(SHOWS_FOR_ARTIST.stmt, artist_id=artist_id))
+    if not artist:
+        return None
+    (id, name, genres, city, state, phone, website, facebook_link,
+     seeking_venue, seeking_description, image_link) = artist[0]
+    past, upcoming = Show.split_past_upcoming(shows)
+    show_dicts = [[{
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "venue_image_link": venue_image_link,
+        "start_time": format_time(start_time),
+    } for start_time, venue_id, venue_name, venue_image_link in rows] for rows in (past, upcoming)]
+    return {
+        "id": id,
+        "name": name,
+        "genres": genres,
+        "city": city,
+        "state": state,
+        "phone": phone,
+        "website": website,
+        "facebook_link": facebook_link,
+        "seeking_venue": seeking_venue,
+        "seeking_description": seeking_description,
+        "image_link": image_link,
+        "past_shows": show_dicts[0],
+        "upcoming_shows": show_dicts[1],
+        "past_shows_count": len(past),
+        "upcoming_shows_count": len(upcoming),
+    }
+
+
+async def venues():
+    rows = await fetch(areas_statement(datetime.utcnow()))
+    return {"data": [{
+        "city": city,
+        "state": state,
+        "venues": [{"id": id, "name": name, "num_upcoming_shows": upcoming} for _, _, id, name, upcoming in group],
+    } for (city, state), group in groupby(rows, key=lambda r: (r[0], r[1]))]}
+
+
+async def artists():
+    rows = await fetch(select(Artist.id, Artist.name).order_by(Artist.name))
+    return {"data": [{"id": id, "name": name} for id, name in rows]}
+
+
+async def summaries(ids, summary_stmt, counts_stmt):
+    rows, counts = await asyncio.gather(
+        fetch(summary_stmt.stmt, ids=ids),
+        fetch(counts_stmt.stmt, ids=ids, now=datetime.utcnow()),
+    )
+    counts = dict(counts)
+    found = {
+        id: {"id": id, "name": name, "image_link": image_link, "city": city, "state": state,
+             "num_upcoming_shows": counts.get(id, 0)}
+        for id, name, image_link, city, state in rows
+    }
+    return {
+        "data": [found[id] for id in ids if id in found],
+        "missing": [id for id in ids if id not in found],
+    }
+
+
+async def batch(query_string, summary_stmt, counts_stmt):
+    try:
+        ids = [int(id) for value in parse_qs(query_string).get('ids', []) for id in value.split(',') if id.strip()]
+    except ValueError:
+        return 400, {"error": "ids must be integers"}
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > config.BATCH_MAX_IDS:
+        return 400, {"error": f"at most {config.BATCH_MAX_IDS} ids per request"}
+    if not ids:
+        return 200, {"data": [], "missing": []}
+    return 200, await summaries(ids, summary_stmt, counts_stmt)
+
+
+DETAIL_PATH = re.compile(r'^/(venues|artists)/(\d+)$')
+
+
+async def route(path, query_string):
+    if path == '/venues':
+        return 200, await venues()
+    if path == '/artists':
+        return 200, await artists()
+    if path == '/venues/batch':
+        return await batch(query_string, VENUE_SUMMARIES, UPCOMING_COUNTS_FOR_VENUES)
+    if path == '/artists/batch':
+        return await batch(query_string, ARTIST_SUMMARIES, UPCOMING_COUNTS_FOR_ARTISTS)
+    match = DETAIL_PATH.match(path)
+    if match:
+        handler = venue_detail if match.group(1) == 'venues' else artist_detail
+        data = await handler(int(match.group(2)))
+        return (404, {"error": "not found"}) if data is None else (200, data)
+    return 404, {"error": "not found"}
+
+
+#  ASGI
+#  ----------------------------------------------------------------
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if engine is not None:
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+    if scope['method'] not in ('GET', 'HEAD'):
+        status, body = 405, {"error": "read-only service"}
+    else:
+        status, body = await route(scope['path'], scope['query_string'].decode('latin-1'))
+    payload = json.dumps(body).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else payload})
@@ -0,0 +1,152 @@
+"""Static asset pipeline.
+
+`build()` bundles the assets used by `layouts/main.html`, minifies the CSS,
+writes content-hashed copies with gzip (and brotli, when the `brotli`
+package is installed) variants into `static/dist/`, and records the logical
+name -> hashed file mapping in `static/dist/manifest.json`.
+
+`Manifest` reads that mapping for the template helpers. Without a build,
+the helpers fall back to the unbundled files under `static/`.
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written
+    brotli = None
+
+# Logical bundle name -> source files (relative to static/), in load order.
+BUNDLES = {
+    'css/app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'js/head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Loaded with defer, so execution order matches the separate tags.
+    'js/app.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+# Referenced on their own (conditional comments, CDN fallback, images).
+FILES = [
+    'js/libs/jquery-1.11.1.min.js',
+    'js/libs/respond-1.4.2.min.js',
+    'img/front-splash.jpg',
+]
+
+# Only text formats are worth compressing.
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+MANIFEST = 'manifest.json'
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCT = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(source):
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(' ', source)
+    source = _CSS_PUNCT.sub(r'\1', source)
+    # A space before ':' is significant in selectors ("a :hover"), after it is not.
+    source = _CSS_COLON.sub(':', source)
+    return source.replace(';}', '}').strip()
+
+
+def _absolute_css_urls(source, path, static_url):
+    # Bundles live in another directory, so relative url()s must be rebased.
+    base = posixpath.dirname(posixpath.join(static_url, path))
+
+    def rebase(match):
+        url = match.group(2)
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        return 'url("%s")' % posixpath.normpath(posixpath.join(base, url))
+
+    return _CSS_URL.sub(rebase, source)
+
+
+def _read(static_folder, path):
+    with open(os.path.join(static_folder, path), 'rb') as f:
+        return f.read()
+
+
+def _bundle(static_folder, name, sources, static_url):
+    if name.endswith('.css'):
+        parts = [
+            _absolute_css_urls(_read(static_folder, path).decode('utf-8'), path, static_url)
+            for path in sources
+        ]
+        return minify_css('\n'.join(parts)).encode('utf-8')
+    # Scripts are concatenated as-is; the libraries already ship minified.
+    return b'\n;\n'.join(_read(static_folder, path).rstrip() for path in sources) + b'\n'
+
+
+def _hashed_name(name, content):
+    root, ext = posixpath.splitext(name)
+    return '%s.%s%s' % (root, hashlib.sha256(content).hexdigest()[:12], ext)
+
+
+def _write(dist_folder, name, content):
+    path = os.path.join(dist_folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    if name.endswith(COMPRESSIBLE):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+
+def build(static_folder, dist_folder, static_url='/static'):
+    """Write the bundles, fingerprinted files and manifest; return the manifest."""
+    manifest = {}
+    outputs = [(name, _bundle(static_folder, name, sources, static_url)) for name, sources in BUNDLES.items()]
+    outputs += [(path, _read(static_folder, path)) for path in FILES]
+    for name, content in outputs:
+        hashed = _hashed_name(name, content)
+        _write(dist_folder, hashed, content)
+        manifest[name] = hashed
+    os.makedirs(dist_folder, exist_ok=True)
+    with open(os.path.join(dist_folder, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Manifest(object):
+    """Logical asset name -> fingerprinted file, loaded once from disk."""
+
+    def __init__(self, dist_folder):
+        self.dist_folder = dist_folder
+        self._entries = None
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            try:
+                with open(os.path.join(self.dist_folder, MANIFEST)) as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+        return self._entries
+
+    def get(self, name):
+        return self.entries.get(name)
@@ -0,0 +1,250 @@
+"""In-process prefix index for search-as-you-type.
+
+Names are kept in one sorted list of (key, id, name) tuples, where the key is
+the case-folded, whitespace-normalised name. A lookup is a bisect to the
+first key >= prefix followed by a short scan, so it costs O(log n + limit)
+regardless of how many names are indexed.
+
+The same entries double as a compact id -> name lookup (`lookup(id)`), e.g.
+for validating submitted ids without a query.
+
+Writes in this process update the entries directly (`add`/`remove`) and
+`publish` them to an optional ChangeLog. Other processes sharing the log
+apply those changes on their next use, at the cost of a few inserts
+rather than a reload. Only when the log no longer reaches back far enough,
+or the index is older than `max_age` seconds, is it reloaded, in the
+background while the current entries keep being served.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+# Ids remembered as missing by lookup(); the set is reset when full.
+MAX_MISSES = 10000
+
+
+def normalize(name):
+    return ' '.join(name.casefold().split())
+
+
+def _spawn_thread(f):
+    threading.Thread(target=f, name='prefix-index-build', daemon=True).start()
+
+
+class ChangeLog(object):
+    """(id, name) changes of one index, kept in the cache (Cache.append_log);
+    name is None for a removal."""
+
+    def __init__(self, cache, namespace, size=1000):
+        self.cache = cache
+        self.namespace = namespace
+        self.size = size
+
+    def version(self):
+        return self.cache.version(self.namespace)
+
+    def append(self, id, name):
+        return self.cache.append_log(self.namespace, (id, name), self.size)
+
+    def since(self, version):
+        return self.cache.log_since(self.namespace, version)
+
+
+class PrefixIndex(object):
+    def __init__(self, loader, fetch=None, changelog=None, max_age=None, spawn=_spawn_thread):
+        # loader() returns an iterable of (id, name) rows; called lazily on
+        # first use and again on each reload.
+        # fetch(id) returns one name or None; used by lookup() on a miss, so
+        # rows created by processes not sharing the changelog are found too.
+        # spawn(f) runs f in the background (reloads).
+        self.loader = loader
+        self.fetch = fetch
+        self.changelog = changelog
+        self.max_age = max_age
+        self.spawn = spawn
+        self._version = 0
+        self._built_at = 0
+        self._entries = []
+        self._keys = {}
+        self._misses = set()
+        # Local changes not yet appended to the changelog, by id.
+        self._unpublished = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # (id, name) adds and (id, None) removes made while build() loads;
+        # None when no build is running.
+        self._pending = None
+        self.built = False
+        self.builds = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def build(self, rows=None):
+        # Read before loading: changes that race the load are applied from
+        # the log afterwards (or kept in _pending if made here).
+        version = self.changelog.version() if self.changelog is not None else 0
+        with self._lock:
+            self._pending = []
+        try:
+            rows = self.loader() if rows is None else rows
+            entries = sorted((normalize(name), id, name) for id, name in rows if name)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        keys = {id: key for key, id, _ in entries}
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._entries, self._keys = entries, keys
+            self._misses = set()
+            self._version, self._built_at = version, time.monotonic()
+            # Writes that committed after the loader's snapshot was taken.
+            for id, name in pending:
+                self._apply(id, name)
+            self.built = True
+            self.builds += 1
+
+    def rebuild_in_background(self):
+        """Reload the entries via spawn(), unless a build is already running."""
+        if not self._build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+            finally:
+                self._build_lock.release()
+
+        try:
+            self.spawn(run)
+        except Exception:
+            self._build_lock.release()
+            raise
+
+    def ensure_built(self):
+        if not self.built:
+            with self._build_lock:
+                if not self.built:
+                    self.build()
+            return
+        if self.changelog is not None and self.changelog.version() != self._version:
+            self.sync()
+        if self.max_age and time.monotonic() - self._built_at > self.max_age:
+            self.rebuild_in_background()
+
+    def sync(self):
+        """Apply the changelog entries made since this index's version."""
+        # One thread at a time, so entries are applied in order; the others
+        # keep serving the current entries meanwhile.
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            changes = self.changelog.since(self._version)
+            if changes is None:
+                self.rebuild_in_background()
+                return
+            version, entries = changes
+            with self._lock:
+                for id, name in entries:
+                    if self._pending is not None:
+                        self._pending.append((id, name))
+                    self._apply(id, name)
+                self._version = max(self._version, version)
+        finally:
+            self._sync_lock.release()
+
+    def add(self, id, name):
+        """Insert or rename an entry, to be sent to the changelog by publish().
+        Before the first build, only writes that race a running build are
+        kept; later loads pick up the rest."""
+        self._add(id, name)
+        if self.changelog is not None:
+            with self._lock:
+                self._unpublished[id] = name
+
+    def remove(self, id):
+        self.add(id, None)
+
+    def _add(self, id, name):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((id, name))
+            if self.built:
+                self._apply(id, name)
+
+    def publish(self):
+        """Append the changes made by add()/remove() to the changelog, then
+        catch up, so this process's own writes don't trigger a reload."""
+        if self.changelog is None:
+            return
+        with self._lock:
+            changes, self._unpublished = self._unpublished, {}
+        try:
+            while changes:
+                id, name = next(iter(changes.items()))
+                self.changelog.append(id, name)
+                del changes[id]
+        finally:
+            if changes:
+                # Keep what could not be sent for the next publish().
+                with self._lock:
+                    changes.update(self._unpublished)
+                    self._unpublished = changes
+        if self.built:
+            self.sync()
+
+    def _apply(self, id, name):
+        self._discard(id)
+        if name is not None:
+            key = normalize(name)
+            insort(self._entries, (key, id, name))
+            self._keys[id] = key
+            self._misses.discard(id)
+
+    def _discard(self, id):
+        key = self._keys.pop(id, None)
+        if key is None:
+            return
+        i = bisect_left(self._entries, (key, id))
+        if i < len(self._entries) and self._entries[i][:2] == (key, id):
+            del self._entries[i]
+
+    def lookup(self, id):
+        """Name for `id`, or None if there is no such entry."""
+        self.ensure_built()
+        with self._lock:
+            key = self._keys.get(id)
+            if key is not None:
+                i = bisect_left(self._entries, (key, id))
+                return self._entries[i][2]
+            if id in self._misses:
+                return None
+        if self.fetch is None:
+            return None
+        name = self.fetch(id)
+        if name:
+            self._add(id, name)
+            return name
+        # Until a change for `id` arrives or the index is reloaded.
+        with self._lock:
+            if len(self._misses) >= MAX_MISSES:
+                self._misses.clear()
+            self._misses.add(id)
+        return None
+
+    def search(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix or limit <= 0:
+            return []
+        self.ensure_built()
+        results = []
+        with self._lock:
+            entries = self._entries
+            for i in range(bisect_left(entries, (prefix,)), len(entries)):
+                key, id, name = entries[i]
+                if not key.startswith(prefix) or len(results) == limit:
+                    break
+                results.append({"id": id, "name": name})
+        return results
@@ -0,0 +1,152 @@
+"""Load test: sync Flask handlers versus the async read service.
+
+Opens --clients concurrent keep-alive connections (500 by default) against
+each server in turn. Every client loops over detail and listing requests
+for random ids for --duration seconds. Reports requests/sec, latency
+percentiles and errors per server, and writes them as JSON.
+
+Start both servers on the same database first, e.g.:
+
+  gunicorn -w 4 --threads 8 -b :5000 app:app
+  uvicorn asgi:app --workers 4 --port 8000 --no-access-log
+  python benchmarks/async_load.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:8000
+
+Both serve /venues/<id>, /artists/<id> and /venues, so the same paths are
+used for both; the sync ones render HTML from the same data. Run the load
+generator on a separate machine (or cores) from the servers where possible.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/venues/{venue}', '/artists/{artist}', '/venues/{venue}', '/artists/{artist}', '/venues']
+
+
+class Connection(object):
+    """Minimal HTTP/1.1 client connection with keep-alive."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(('GET %s HTTP/1.1\r\nHost: %s\r\nAccept-Encoding: identity\r\n\r\n'
+                           % (path, self.host)).encode())
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed')
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+        else:
+            await self.reader.read()
+            headers['connection'] = 'close'
+        if version == b'HTTP/1.0' or headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def client(base, paths, venue_ids, artist_ids, deadline, rng, results):
+    url = urlsplit(base)
+    conn = Connection(url.hostname, url.port or 80)
+    while time.monotonic() < deadline:
+        path = rng.choice(paths).format(venue=rng.choice(venue_ids), artist=rng.choice(artist_ids))
+        start = time.monotonic()
+        try:
+            status = await conn.request(path)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            conn.close()
+            status = None
+        results.append((time.monotonic() - start, status))
+    conn.close()
+
+
+async def run(base, clients, duration, paths, venue_ids, artist_ids, seed):
+    rng = random.Random(seed)
+    results = []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*[
+        client(base, paths, venue_ids, artist_ids, deadline, random.Random(rng.random()), results)
+        for _ in range(clients)
+    ])
+    elapsed = time.monotonic() - started
+    latencies = sorted(latency for latency, status in results if status is not None and status < 400)
+    errors = len(results) - len(latencies)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def id_range(value):
+    low, _, high = value.partition('-')
+    return list(range(int(low), int(high or low) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync', metavar='URL', help='base URL of the Flask app')
+    parser.add_argument('--async', dest='async_', metavar='URL', help='base URL of asgi.py')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30, help='seconds per server')
+    parser.add_argument('--path', action='append', help='path template, may use {venue} and {artist} (repeatable)')
+    parser.add_argument('--venue-ids', type=id_range, default=id_range('1-200'), help='e.g. 1-200')
+    parser.add_argument('--artist-ids', type=id_range, default=id_range('1-1000'), help='e.g. 1-1000')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+    if not (args.sync or args.async_):
+        parser.error('give --sync and/or --async')
+
+    results = {'clients': args.clients, 'duration': args.duration, 'paths': args.path or DEFAULT_PATHS}
+    for name, base in (('sync', args.sync), ('async', args.async_)):
+        if not base:
+            continue
+        results[name] = asyncio.run(run(base, args.clients, args.duration, results['paths'],
+                                        args.venue_ids, args.artist_ids, args.seed))
+        print('%-6s %8.1f rps  p50 %8s ms  p95 %8s ms  p99 %8s ms  %d errors / %d requests' % (
+            name, results[name]['rps'], results[name]['p50_ms'], results[name]['p95_ms'],
+            results[name]['p99_ms'], results[name]['errors'], results[name]['requests']), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
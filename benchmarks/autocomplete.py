@@ -0,0 +1,67 @@
+"""Prefix index build, lookup, id lookup and update cost on synthetic names.
+
+Usage:
+  python benchmarks/autocomplete.py [--names 1000000] [--lookups 100000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autocomplete import PrefixIndex  # noqa: E402
+
+WORDS = ['the', 'blue', 'red', 'hall', 'club', 'jazz', 'rock', 'band', 'house', 'park',
+         'music', 'bar', 'lounge', 'theatre', 'city', 'stage', 'room', 'garden', 'sound', 'hop']
+
+
+def names(count, seed):
+    rng = random.Random(seed)
+    for id in range(1, count + 1):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        suffix = ''.join(rng.choice(string.ascii_lowercase) for _ in range(4))
+        yield id, ' '.join(words + [suffix]).title()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rows = list(names(args.names, args.seed))
+    index = PrefixIndex(loader=lambda: rows)
+    start = time.perf_counter()
+    index.build()
+    print(f'build        {len(index):>10} names {time.perf_counter() - start:>10.3f} s')
+
+    rng = random.Random(args.seed)
+    prefixes = [name[:rng.randint(1, 8)] for _, name in rng.sample(rows, min(args.lookups, len(rows)))]
+    start = time.perf_counter()
+    hits = sum(len(index.search(prefix)) for prefix in prefixes)
+    elapsed = time.perf_counter() - start
+    print(f'lookup       {len(prefixes):>10} calls {elapsed / len(prefixes) * 1e6:>10.1f} us/call ({hits} hits)')
+
+    ids = [rng.randint(1, args.names) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    found = sum(index.lookup(id) is not None for id in ids)
+    elapsed = time.perf_counter() - start
+    print(f'id lookup    {len(ids):>10} calls {elapsed / len(ids) * 1e6:>10.1f} us/call ({found} found)')
+
+    start = time.perf_counter()
+    for id in range(args.names + 1, args.names + args.updates + 1):
+        index.add(id, 'New Listing %d' % id)
+    for id in range(1, args.updates + 1):
+        index.remove(id)
+    elapsed = time.perf_counter() - start
+    print(f'add+remove   {args.updates:>10} each  {elapsed / (2 * args.updates) * 1e6:>10.1f} us/call')
+
+
+if __name__ == '__main__':
+    main()
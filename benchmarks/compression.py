@@ -0,0 +1,78 @@
+"""Bytes on the wire and CPU per request for the main pages, per encoding.
+
+Wraps the unwrapped Flask app in CompressionMiddleware with each setting and
+reports the median response size and process CPU time per request, plus the
+CPU added over the uncompressed baseline.
+
+Usage:
+  python benchmarks/compression.py [--requests 50] [--term a]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = [
+    ('GET', '/', None),
+    ('GET', '/venues', None),
+    ('GET', '/artists', None),
+    ('GET', '/shows', None),
+    ('POST', '/venues/search', 'search_term'),
+    ('POST', '/artists/search', 'search_term'),
+]
+
+
+def settings():
+    yield 'identity', None, {}
+    for level in (1, 6, 9):
+        yield 'gzip-%d' % level, 'gzip', {'level': level}
+    from compression import brotli
+    if brotli is not None:
+        for quality in (1, 4, 11):
+            yield 'br-%d' % quality, 'br', {'brotli_quality': quality}
+
+
+def measure(client, method, path, form, encoding, requests):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    client.open(path, method=method, headers=headers, data=form).get_data()  # warm-up
+    sizes, cpu = [], []
+    for _ in range(requests):
+        start = time.process_time()
+        response = client.open(path, method=method, headers=headers, data=form)
+        body = response.get_data()
+        cpu.append(time.process_time() - start)
+        sizes.append(len(body))
+    return statistics.median(sizes), statistics.median(cpu) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--term', default='a')
+    parser.add_argument('--min-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    os.environ['COMPRESSION_ENABLED'] = '0'
+    sys.path.insert(0, ROOT)
+    from werkzeug.test import Client
+    from werkzeug.wrappers import Response
+    from app import app
+    from compression import CompressionMiddleware
+
+    print(f"{'page':<22} {'setting':<10} {'bytes':>10} {'cpu ms':>8} {'+cpu ms':>8}")
+    for method, path, field in PAGES:
+        form = {field: args.term} if field else None
+        baseline = None
+        for name, encoding, options in settings():
+            wsgi = app.wsgi_app if encoding is None else CompressionMiddleware(app.wsgi_app, min_size=args.min_size, **options)
+            client = Client(wsgi, Response)
+            size, cpu = measure(client, method, path, form, encoding, args.requests)
+            baseline = cpu if baseline is None else baseline
+            print(f'{method + " " + path:<22} {name:<10} {size:>10.0f} {cpu:>8.2f} {cpu - baseline:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Import-time regression check for `app`.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters and fails
+(exit status 1) when the median cumulative import time exceeds the budget,
+or when a module that should be loaded lazily is imported eagerly.
+
+Usage:
+  python benchmarks/import_time.py [--runs 5] [--budget-ms 600] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by forms, the datetime filter or `flask db`.
+LAZY_MODULES = ('forms', 'flask_wtf', 'wtforms', 'babel', 'dateutil', 'flask_migrate', 'alembic')
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure():
+    env = dict(os.environ)
+    env.pop('PRELOAD_MODULES', None)
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stderr
+    modules, children, pending = {}, [], []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        name, cumulative, depth = match.group(4), int(match.group(2)), len(match.group(3))
+        modules[name] = cumulative
+        if depth == 3:
+            pending.append((name, cumulative))
+        elif depth == 1:
+            if name == 'app':
+                children = pending
+            pending = []
+    return modules, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_TIME_BUDGET_MS', 600)))
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    samples = [measure() for _ in range(args.runs)]
+    total_ms = statistics.median(modules['app'] for modules, _ in samples) / 1000
+
+    last, children = samples[-1]
+    direct = sorted(children, key=lambda item: item[1], reverse=True)
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name, cumulative in direct[:args.top]:
+        print(f'{name:<40} {cumulative / 1000:>14.1f}')
+    print(f"{'app (median of %d)' % args.runs:<40} {total_ms:>14.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f'import time {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget')
+    eager = [name for name in LAZY_MODULES if name in last]
+    if eager:
+        failures.append('imported eagerly: ' + ', '.join(eager))
+    for failure in failures:
+        print('FAIL: ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
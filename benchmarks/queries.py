@@ -0,0 +1,145 @@
+"""Per-query latency of the hot queries, before and after statements.py.
+
+Each query runs in three ways against the configured database:
+
+  adhoc     built with the Query API on every call, as the handlers used to
+  cached    the prebuilt statement from model.py (client-side compile cache)
+  prepared  the same statement PREPAREd on the server (PostgreSQL only)
+
+With the pg_stat_statements extension installed, server-side planning and
+execution time per call is reported as well (planning time needs
+pg_stat_statements.track_planning = on).
+
+Usage:
+  DB_NAME=fyyur_bench python benchmarks/queries.py [--calls 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def adhoc_queries(db, Show, Venue, Artist):
+    def upcoming_count_for_venue(venue_id, now):
+        return Show.query.filter(Show.venue_id == venue_id, Show.start_time > now).count()
+
+    def shows_for_venue(venue_id, now):
+        past = (db.session.query(Show, Artist).join(Artist, Show.artist_id == Artist.id)
+                .filter(Show.venue_id == venue_id, Show.start_time <= now)
+                .order_by(Show.start_time.desc()).all())
+        upcoming = (db.session.query(Show, Artist).join(Artist, Show.artist_id == Artist.id)
+                    .filter(Show.venue_id == venue_id, Show.start_time > now)
+                    .order_by(Show.start_time.asc()).all())
+        return past, upcoming
+
+    def search_venue_names(term, now):
+        return Venue.query.filter(Venue.name.ilike(f"%{term}%")).all()
+
+    return {
+        'upcoming_count_for_venue': upcoming_count_for_venue,
+        'shows_for_venue': shows_for_venue,
+        'search_venue_names': search_venue_names,
+    }
+
+
+def statement_queries(Show, Venue):
+    return {
+        'upcoming_count_for_venue': Show.upcoming_count_for_venue.uncached,
+        'shows_for_venue': lambda venue_id, now: Show.split_past_upcoming(Show.for_venue(venue_id), now),
+        'search_venue_names': lambda term, now: Venue.search_by_name(term),
+    }
+
+
+def server_time(db):
+    """(plan ms, exec ms) summed over pg_stat_statements, or None."""
+    try:
+        row = db.session.execute(db.text(
+            "SELECT sum(total_plan_time), sum(total_exec_time) FROM pg_stat_statements "
+            "WHERE query NOT ILIKE '%pg_stat_statements%'"
+        )).one()
+        return float(row[0] or 0), float(row[1] or 0)
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def reset_server_time(db):
+    try:
+        db.session.execute(db.text('SELECT pg_stat_statements_reset()'))
+    except Exception:
+        db.session.rollback()
+
+
+def measure(db, query, args_list):
+    reset_server_time(db)
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        query(*args)
+        latencies.append(time.perf_counter() - start)
+        db.session.rollback()  # release the connection like a request would
+    server = server_time(db)
+    latencies.sort()
+    result = {
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p95_us': latencies[int(len(latencies) * 0.95)] * 1e6,
+        'mean_us': statistics.mean(latencies) * 1e6,
+    }
+    if server is not None:
+        result['server_plan_us'] = server[0] * 1000 / len(args_list)
+        result['server_exec_us'] = server[1] * 1000 / len(args_list)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000, help='calls per query and variant')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.environ['CACHE_BACKEND'] = 'null'
+    from app import app
+    from model import db, Show, Venue, Artist
+    from statements import statements
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        venue_ids = [id for id, in db.session.query(Venue.id)]
+        if not venue_ids:
+            raise SystemExit('No data to benchmark; load some with benchmarks/seed.py first.')
+        now = datetime.utcnow()
+        calls = {
+            'upcoming_count_for_venue': [(rng.choice(venue_ids), now) for _ in range(args.calls)],
+            'shows_for_venue': [(rng.choice(venue_ids), now) for _ in range(args.calls)],
+            'search_venue_names': [(rng.choice('aeiou') + rng.choice('lnrst'), now) for _ in range(args.calls)],
+        }
+        variants = [('adhoc', False, adhoc_queries(db, Show, Venue, Artist)),
+                    ('cached', False, statement_queries(Show, Venue))]
+        if db.engine.dialect.name == 'postgresql':
+            variants.append(('prepared', True, statement_queries(Show, Venue)))
+
+        print('%-26s %-9s %10s %10s %10s %12s %12s' % (
+            'query', 'variant', 'p50 us', 'p95 us', 'mean us', 'srv plan us', 'srv exec us'))
+        for name, call_args in calls.items():
+            for variant, server_side, queries in variants:
+                statements.server_side = server_side
+                for warm in call_args[:50]:
+                    queries[name](*warm)
+                db.session.rollback()
+                result = measure(db, queries[name], call_args)
+                print('%-26s %-9s %10.1f %10.1f %10.1f %12s %12s' % (
+                    name, variant, result['p50_us'], result['p95_us'], result['mean_us'],
+                    '%.1f' % result['server_plan_us'] if 'server_plan_us' in result else '-',
+                    '%.1f' % result['server_exec_us'] if 'server_exec_us' in result else '-',
+                ))
+        statements.server_side = app.config['DB_PREPARED_STATEMENTS']
+
+
+if __name__ == '__main__':
+    main()
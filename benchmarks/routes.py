@@ -0,0 +1,322 @@
+"""Latency, throughput and query counts for every route.
+
+Runs each handler in-process through the Flask test client against the
+configured database, which should hold seeded data (see seed.py), and
+writes the results as JSON so runs can be compared across commits:
+
+  DB_NAME=fyyur_bench python benchmarks/seed.py --reset
+  DB_NAME=fyyur_bench python benchmarks/routes.py [--requests 200] [--concurrency 8]
+  python benchmarks/routes.py --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+For a quick in-process run without PostgreSQL:
+
+  DATABASE_URL=sqlite:///:memory: python benchmarks/routes.py --seed-data --concurrency 1
+
+Write routes create their own rows and delete them again afterwards.
+Latency is measured sequentially; throughput is measured again with
+--concurrency threads for the read routes.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, *args, **kwargs):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+def _artist_form(name, rng):
+    return {
+        'name': name, 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100',
+        'image_link': 'https://example.com/a.jpg', 'genres': rng.choice(['Jazz', 'Folk', 'Pop']),
+        'facebook_link': 'https://www.facebook.com/bench', 'website_link': 'https://example.com',
+        'seeking_description': '',
+    }
+
+
+def _venue_form(name, rng):
+    return dict(_artist_form(name, rng), address='1 Bench St')
+
+
+def scenarios(artist_ids, venue_ids, rng, created):
+    """(name, method, path, form-data factory) for every route."""
+    tag = '%x' % int(time.time())
+    counter = iter(range(1, 10 ** 9))
+
+    def artist():
+        return rng.choice(artist_ids)
+
+    def venue():
+        return rng.choice(venue_ids)
+
+    def new_artist():
+        return _artist_form('Bench Artist %s-%d' % (tag, next(counter)), rng)
+
+    def new_venue():
+        return _venue_form('Bench Venue %s-%d' % (tag, next(counter)), rng)
+
+    def new_show():
+        start = datetime.utcnow() + timedelta(days=rng.randint(1, 90))
+        return {'artist_id': artist(), 'venue_id': venue(), 'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}
+
+    return [
+        ('home', 'GET', lambda: '/', None),
+        ('venues', 'GET', lambda: '/venues', None),
+        ('artists', 'GET', lambda: '/artists', None),
+        ('shows', 'GET', lambda: '/shows', None),
+        ('search_venues', 'POST', lambda: '/venues/search', lambda: {'search_term': rng.choice('aeiou')}),
+        ('search_artists', 'POST', lambda: '/artists/search', lambda: {'search_term': rng.choice('aeiou')}),
+        ('autocomplete_venues', 'GET', lambda: '/venues/autocomplete?q=' + rng.choice('BGRS'), None),
+        ('autocomplete_artists', 'GET', lambda: '/artists/autocomplete?q=' + rng.choice('BGRS'), None),
+        ('batch_venues', 'GET', lambda: '/venues/batch?ids=' + ','.join(str(venue()) for _ in range(20)), None),
+        ('batch_artists', 'GET', lambda: '/artists/batch?ids=' + ','.join(str(artist()) for _ in range(20)), None),
+        ('show_venue', 'GET', lambda: '/venues/%d' % venue(), None),
+        ('show_artist', 'GET', lambda: '/artists/%d' % artist(), None),
+        ('create_venue_form', 'GET', lambda: '/venues/create', None),
+        ('create_artist_form', 'GET', lambda: '/artists/create', None),
+        ('create_shows', 'GET', lambda: '/shows/create', None),
+        ('edit_venue', 'GET', lambda: '/venues/%d/edit' % venue(), None),
+        ('edit_artist', 'GET', lambda: '/artists/%d/edit' % artist(), None),
+        ('create_venue_submission', 'POST', lambda: '/venues/create', new_venue),
+        ('create_artist_submission', 'POST', lambda: '/artists/create', new_artist),
+        ('create_show_submission', 'POST', lambda: '/shows/create', new_show),
+        ('edit_venue_submission', 'POST', lambda: '/venues/%d/edit' % rng.choice(created['venues']), new_venue),
+        ('edit_artist_submission', 'POST', lambda: '/artists/%d/edit' % rng.choice(created['artists']), new_artist),
+        ('delete_venue', 'DELETE', lambda: '/venues/%d' % created['venues'].pop(), None),
+        ('delete_artist', 'DELETE', lambda: '/artists/%d' % created['artists'].pop(), None),
+        ('metrics', 'GET', lambda: '/metrics', None),
+    ]
+
+
+def request(client, method, path, data):
+    response = client.open(path, method=method, data=data)
+    response.get_data()  # drains streamed pages
+    return response.status_code
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'queries_per_request': round(statistics.mean(queries), 2),
+    }
+
+
+def measure(app, counter, method, path, data, count, warmup):
+    client = app.test_client()
+    for _ in range(warmup):
+        request(client, method, path(), data() if data else None)
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(count):
+        target, form = path(), data() if data else None
+        counter.reset()
+        start = time.perf_counter()
+        status = request(client, method, target, form)
+        latencies.append(time.perf_counter() - start)
+        queries.append(counter.count)
+        errors += status >= 400
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def measure_concurrent(app, method, path, data, count, concurrency):
+    def worker(n):
+        client = app.test_client()
+        return [request(client, method, path(), data() if data else None) for _ in range(n)]
+
+    per_thread = max(1, count // concurrency)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        statuses = [s for result in pool.map(worker, [per_thread] * concurrency) for s in result]
+    elapsed = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'rps': round(len(statuses) / elapsed, 1),
+        'errors': sum(status >= 400 for status in statuses),
+    }
+
+
+def git_sha():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _max_id(db, model):
+    return db.session.query(db.func.max(model.id)).scalar() or 0
+
+
+def _ids_after(app, db, model, baseline):
+    with app.app_context():
+        ids = [id for id, in db.session.query(model.id).filter(model.id > baseline)]
+        db.session.remove()
+    return ids
+
+
+def run(args):
+    sys.path.insert(0, ROOT)
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    if args.cache:
+        os.environ['CACHE_BACKEND'] = args.cache
+    from sqlalchemy import event
+    from app import app, db, Artist, Venue, Show
+    app.config['WTF_CSRF_ENABLED'] = False
+    if args.seed_data:
+        import seed
+        seed.seed(app, args.artists, args.venues, args.shows, args.seed, reset=True)
+
+    rng = random.Random(args.seed)
+    counter = QueryCounter()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', counter)
+        dataset = {
+            'artists': Artist.query.count(),
+            'venues': Venue.query.count(),
+            'shows': Show.query.count(),
+        }
+        artist_ids = [id for id, in db.session.query(Artist.id)]
+        venue_ids = [id for id, in db.session.query(Venue.id)]
+        # Anything above these ids was created by the benchmark.
+        baseline = {model: _max_id(db, model) for model in (Artist, Venue, Show)}
+        database = repr(db.engine.url)
+        db.session.remove()
+    if not artist_ids or not venue_ids:
+        raise SystemExit('No data to benchmark; load some with benchmarks/seed.py first.')
+
+    created = {'artists': [], 'venues': []}
+    models = {'artists': Artist, 'venues': Venue}
+    routes = {}
+    try:
+        for name, method, path, data in scenarios(artist_ids, venue_ids, rng, created):
+            kind = name.split('_')[1] + 's' if '_' in name else None
+            if args.route and name not in args.route:
+                continue
+            if name.startswith(('edit_', 'delete_')) and method != 'GET' and not created.get(kind):
+                continue  # needs rows from the matching create route
+            count = len(created[kind]) if name.startswith('delete_') else args.requests
+            reads = method == 'GET'
+            routes[name] = measure(app, counter, method, path, data, count, args.warmup if reads else 0)
+            if reads and args.concurrency > 1:
+                routes[name]['concurrent'] = measure_concurrent(app, method, path, data, args.requests, args.concurrency)
+            if method == 'POST' and kind in created and name.startswith('create_'):
+                created[kind] = _ids_after(app, db, models[kind], baseline[models[kind]])
+            print('%-26s %s' % (name, _format(routes[name])))
+    finally:
+        with app.app_context():
+            db.session.query(Show).filter(Show.id > baseline[Show]).delete(synchronize_session=False)
+            for model in (Artist, Venue):
+                db.session.query(model).filter(model.id > baseline[model]).delete(synchronize_session=False)
+            db.session.commit()
+            db.session.remove()
+
+    return {
+        'git_sha': git_sha(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'dataset': dataset,
+        'config': {
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'cache_backend': app.config.get('CACHE_BACKEND'),
+            'database': database,
+        },
+        'routes': routes,
+    }
+
+
+def _format(stats):
+    line = 'p50 %(p50_ms)8.2f ms  p95 %(p95_ms)8.2f ms  p99 %(p99_ms)8.2f ms  %(rps)8.1f rps  %(queries_per_request)5.1f q/req' % stats
+    if stats['errors']:
+        line += '  %d errors' % stats['errors']
+    if 'concurrent' in stats:
+        line += '  | x%(concurrency)d %(rps)8.1f rps' % stats['concurrent']
+    return line
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print('%-26s %12s %12s %8s %10s' % ('route (%s -> %s)' % (old['git_sha'], new['git_sha']),
+                                          'p50 ms', 'p95 ms', 'rps', 'queries'))
+    for name, after in new['routes'].items():
+        before = old['routes'].get(name)
+        if before is None:
+            print('%-26s %12s' % (name, 'new'))
+            continue
+
+        def delta(key):
+            if not before[key]:
+                return '%+.1f' % after[key]
+            return '%+.0f%%' % ((after[key] - before[key]) / before[key] * 100)
+
+        print('%-26s %12s %12s %8s %10s' % (name, delta('p50_ms'), delta('p95_ms'), delta('rps'),
+                                            '%g->%g' % (before['queries_per_request'], after['queries_per_request'])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per read route')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads for the throughput pass (1 to skip)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--seed-data', action='store_true',
+                        help='load a fresh seeded dataset first (destroys existing data)')
+    parser.add_argument('--artists', type=int, default=1000, help='with --seed-data')
+    parser.add_argument('--venues', type=int, default=200, help='with --seed-data')
+    parser.add_argument('--shows', type=int, default=10000, help='with --seed-data')
+    parser.add_argument('--cache', choices=['lru', 'sqlite', 'null'], help='override CACHE_BACKEND')
+    parser.add_argument('--route', action='append', help='only run this route (repeatable)')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<git sha>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two results files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, '%s.json' % results['git_sha'])
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Wrote', output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Seeded synthetic data for benchmarks.
+
+Generates artists, venues and shows with skewed, roughly realistic
+distributions (a few big cities, popular genres, popular artists and venues
+hosting most shows) and bulk-loads them in batches. The same seed and counts
+always produce the same data.
+
+Point it at a dedicated database, e.g.:
+
+  createdb fyyur_bench
+  DB_NAME=fyyur_bench python benchmarks/seed.py --reset --artists 5000 --venues 1000 --shows 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CITIES = [
+    ('New York', 'NY', 20), ('Los Angeles', 'CA', 15), ('Chicago', 'IL', 10),
+    ('San Francisco', 'CA', 8), ('Austin', 'TX', 8), ('Nashville', 'TN', 7),
+    ('Seattle', 'WA', 6), ('New Orleans', 'LA', 6), ('Atlanta', 'GA', 5),
+    ('Denver', 'CO', 5), ('Boston', 'MA', 5), ('Portland', 'OR', 5),
+]
+
+GENRES = [
+    ('Rock n Roll', 18), ('Pop', 16), ('Hip-Hop', 14), ('Electronic', 10),
+    ('Jazz', 8), ('R&B', 7), ('Country', 6), ('Alternative', 6), ('Folk', 4),
+    ('Soul', 4), ('Blues', 3), ('Funk', 3), ('Punk', 3), ('Reggae', 3),
+    ('Heavy Metal', 3), ('Classical', 2), ('Instrumental', 2),
+    ('Musical Theatre', 1), ('Other', 1),
+]
+
+ADJECTIVES = ['Blue', 'Red', 'Golden', 'Silver', 'Electric', 'Velvet', 'Midnight', 'Wild',
+              'Neon', 'Crimson', 'Lucky', 'Broken', 'Hollow', 'Royal', 'Little', 'Grand']
+ARTIST_NOUNS = ['Owls', 'Foxes', 'Echoes', 'Rebels', 'Saints', 'Wolves', 'Strangers', 'Kings',
+                'Ghosts', 'Riders', 'Shadows', 'Sparrows', 'Tigers', 'Drifters']
+VENUE_NOUNS = ['Hall', 'Lounge', 'Room', 'Club', 'Theatre', 'Garden', 'Stage', 'Tavern',
+               'Ballroom', 'Warehouse', 'Cellar', 'House']
+STREETS = ['Main St', 'Oak Ave', 'Market St', 'Broadway', 'Elm St', 'Sunset Blvd', '2nd Ave']
+
+
+def _weighted(pairs):
+    values = [value for value, _ in pairs]
+    return values, list(accumulate(weight for _, weight in pairs))
+
+
+def _zipf(count, exponent=0.8):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def _genres(rng, genres, cum_weights):
+    picked = set()
+    for _ in range(rng.randint(1, 3)):
+        picked.add(rng.choices(genres, cum_weights=cum_weights)[0])
+    return sorted(picked)
+
+
+def _unique_name(rng, nouns, taken, city, state):
+    base = '%s %s' % (rng.choice(ADJECTIVES), rng.choice(nouns))
+    name, n = base, 1
+    while (name, city, state) in taken:
+        n += 1
+        name = '%s %d' % (base, n)
+    taken.add((name, city, state))
+    return name
+
+
+def generate(artists, venues, shows, seed=1, now=None):
+    """Return (artist_rows, venue_rows, show_rows) as lists of dicts with explicit ids."""
+    rng = random.Random(seed)
+    # Show times are relative to `now` (default: today) so past/upcoming
+    # splits stay the same whenever the data is generated.
+    now = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    cities, city_weights = _weighted([(city[:2], city[2]) for city in CITIES])
+    genres, genre_weights = _weighted(GENRES)
+
+    artist_rows, taken = [], set()
+    for id in range(1, artists + 1):
+        city, state = rng.choices(cities, cum_weights=city_weights)[0]
+        artist_rows.append({
+            'id': id,
+            'name': _unique_name(rng, ARTIST_NOUNS, taken, city, state),
+            'city': city,
+            'state': state,
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+            'image_link': 'https://picsum.photos/seed/artist%d/300/300' % id,
+            'facebook_link': 'https://www.facebook.com/artist%d' % id,
+            'website_link': 'https://artist%d.example.com' % id if rng.random() < 0.6 else None,
+            'seeking_venue': rng.random() < 0.3,
+            'seeking_description': 'Looking for shows in %s' % city if rng.random() < 0.3 else None,
+            'genres': _genres(rng, genres, genre_weights),
+        })
+
+    venue_rows, taken = [], set()
+    for id in range(1, venues + 1):
+        city, state = rng.choices(cities, cum_weights=city_weights)[0]
+        venue_rows.append({
+            'id': id,
+            'name': _unique_name(rng, VENUE_NOUNS, taken, city, state),
+            'city': city,
+            'state': state,
+            'address': '%d %s' % (rng.randint(1, 2000), rng.choice(STREETS)),
+            'phone': '%03d-%03d-%04d' % (rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+            'image_link': 'https://picsum.photos/seed/venue%d/300/300' % id,
+            'facebook_link': 'https://www.facebook.com/venue%d' % id,
+            'website_link': 'https://venue%d.example.com' % id if rng.random() < 0.7 else None,
+            'seeking_talent': rng.random() < 0.4,
+            'seeking_description': 'Booking local acts' if rng.random() < 0.4 else None,
+            'genres': _genres(rng, genres, genre_weights),
+        })
+
+    # Popular artists and venues get most of the shows; about two thirds of
+    # the shows are in the past.
+    artist_ids, venue_ids = list(range(1, artists + 1)), list(range(1, venues + 1))
+    rng.shuffle(artist_ids)
+    rng.shuffle(venue_ids)
+    artist_weights, venue_weights = _zipf(artists), _zipf(venues)
+    show_rows = []
+    for id in range(1, shows + 1):
+        show_rows.append({
+            'id': id,
+            'artist_id': rng.choices(artist_ids, cum_weights=artist_weights)[0],
+            'venue_id': rng.choices(venue_ids, cum_weights=venue_weights)[0],
+            'start_time': now + timedelta(hours=rng.randint(-365 * 24, 180 * 24)),
+        })
+    return artist_rows, venue_rows, show_rows
+
+
+def load(db, rows_by_model, batch_size=5000):
+    """Bulk-insert rows with executemany in batches and fix up id sequences."""
+    with db.engine.begin() as conn:
+        for model, rows in rows_by_model:
+            for start in range(0, len(rows), batch_size):
+                conn.execute(model.__table__.insert(), rows[start:start + batch_size])
+            if conn.dialect.name == 'postgresql' and rows:
+                table = model.__tablename__
+                conn.execute(db.text(
+                    "SELECT setval(pg_get_serial_sequence('%s', 'id'), (SELECT MAX(id) FROM %s))" % (table, table)
+                ))
+
+
+def seed(app, artists, venues, shows, seed=1, reset=False):
+    from model import db, Artist, Venue, Show
+    with app.app_context():
+        if reset:
+            db.drop_all()
+            db.create_all()
+        elif db.session.query(Artist.id).first() or db.session.query(Venue.id).first():
+            raise SystemExit('Tables are not empty; pass --reset to recreate them (destroys existing data).')
+        db.session.remove()
+        artist_rows, venue_rows, show_rows = generate(artists, venues, shows, seed)
+        load(db, [(Artist, artist_rows), (Venue, venue_rows), (Show, show_rows)])
+    return {'artists': artists, 'venues': venues, 'shows': shows, 'seed': seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--artists', type=int, default=1000)
+    parser.add_argument('--venues', type=int, default=200)
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the tables first')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from app import app
+    start = time.perf_counter()
+    dataset = seed(app, args.artists, args.venues, args.shows, args.seed, args.reset)
+    print('Loaded %(artists)d artists, %(venues)d venues, %(shows)d shows (seed %(seed)d)' % dataset,
+          'in %.1f s' % (time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""First-request latency per route, cold versus warm template cache.
+
+Each measurement runs in a fresh interpreter so nothing is shared between
+samples except the on-disk Jinja bytecode cache:
+
+  cold  the cache directory is emptied before every sample
+  warm  the cache is filled once with `flask precompile-templates`
+
+Usage:
+  python benchmarks/startup.py [--runs 5] [--route /venues ...]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ROUTES = [
+    '/',
+    '/venues',
+    '/artists',
+    '/shows',
+    '/venues/1',
+    '/artists/1',
+    '/venues/create',
+    '/artists/create',
+    '/shows/create',
+    '/venues/1/edit',
+    '/artists/1/edit',
+]
+
+
+def first_request(route):
+    sys.path.insert(0, ROOT)
+    from app import app
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.get(route)
+    response.get_data()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'status': response.status_code, 'seconds': elapsed}))
+
+
+def sample(route, cache_dir):
+    env = dict(os.environ, JINJA_BYTECODE_CACHE_DIR=cache_dir, FLASK_APP='app.py')
+    proc = subprocess.run(
+        [sys.executable, __file__, '--child', route],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def precompile(cache_dir):
+    env = dict(os.environ, JINJA_BYTECODE_CACHE_DIR=cache_dir, FLASK_APP='app.py')
+    subprocess.run(
+        [sys.executable, '-m', 'flask', 'precompile-templates'],
+        cwd=ROOT, env=env, check=True, capture_output=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--route', action='append', dest='routes')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return first_request(args.child)
+
+    cache_dir = tempfile.mkdtemp(prefix='fyyur-jinja-')
+    try:
+        print(f"{'route':<20} {'status':>6} {'cold ms':>10} {'warm ms':>10}")
+        for route in args.routes or DEFAULT_ROUTES:
+            cold = []
+            for _ in range(args.runs):
+                shutil.rmtree(cache_dir)
+                os.makedirs(cache_dir)
+                cold.append(sample(route, cache_dir))
+            precompile(cache_dir)
+            warm = [sample(route, cache_dir) for _ in range(args.runs)]
+            if None in cold or None in warm:
+                print(f'{route:<20} {"error":>6}')
+                continue
+            print('{:<20} {:>6} {:>10.1f} {:>10.1f}'.format(
+                route,
+                warm[-1]['status'],
+                statistics.median(s['seconds'] for s in cold) * 1000,
+                statistics.median(s['seconds'] for s in warm) * 1000,
+            ))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
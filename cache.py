@@ -0,0 +1,295 @@
+"""Small cache layer for query helpers and per-entity view data.
+
+`cache = Cache()` is bound to the app with `cache.init_app(app)`, the same
+way as `db`, and picks its backend from the config:
+
+  CACHE_BACKEND = "lru"     in-process LRU with TTL (per worker)
+  CACHE_BACKEND = "sqlite"  shared by every process on the host through a
+                            local SQLite file (stand-in for a network cache)
+  CACHE_BACKEND = "null"    no caching
+
+`@cache.memoize()` caches a function by its positional arguments. Concurrent
+misses for the same key are coalesced: one caller computes the value while
+the others wait for it, within the process and, with the SQLite backend,
+across processes through a short-lived lease row.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+MISSING = object()
+
+
+class _KeyLocks(object):
+    """One lock per key currently being computed, dropped when unused."""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def __call__(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+_key_lock = _KeyLocks()
+
+
+class NullBackend(object):
+    evictions = 0
+
+    def get(self, key):
+        return MISSING
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    @contextmanager
+    def lock(self, key, timeout):
+        yield
+
+
+class LRUBackend(object):
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @contextmanager
+    def lock(self, key, timeout):
+        with _key_lock(key):
+            yield
+
+
+class SQLiteBackend(object):
+    def __init__(self, path, maxsize=10000):
+        self.path = path
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL)')
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def get(self, key):
+        row = self._connect().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        expires = time.time() + ttl if ttl else None
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires),
+        )
+        # Expired rows first, then the least recently written ones.
+        evicted = conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),)).rowcount
+        evicted += conn.execute(
+            'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY rowid DESC LIMIT -1 OFFSET ?)',
+            (self.maxsize,),
+        ).rowcount
+        self.evictions += evicted
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+    @contextmanager
+    def lock(self, key, timeout):
+        # In-process first, then a lease row that other processes wait on.
+        # A crashed holder's lease expires after `timeout`; a waiter that
+        # times out computes the value itself rather than failing.
+        with _key_lock(key):
+            conn = self._connect()
+            deadline = time.time() + timeout
+            leased = False
+            while True:
+                now = time.time()
+                conn.execute('DELETE FROM leases WHERE key = ? AND expires <= ?', (key, now))
+                leased = conn.execute(
+                    'INSERT OR IGNORE INTO leases (key, expires) VALUES (?, ?)', (key, now + timeout)
+                ).rowcount == 1
+                if leased or now >= deadline or self.get(key) is not MISSING:
+                    break
+                time.sleep(0.01)
+            try:
+                yield
+            finally:
+                if leased:
+                    conn.execute('DELETE FROM leases WHERE key = ?', (key,))
+
+
+class Cache(object):
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.default_ttl = None
+        self.lock_timeout = 10
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'lru')
+        if kind == 'lru':
+            self.backend = LRUBackend(app.config.get('CACHE_MAXSIZE', 1024))
+        elif kind == 'sqlite':
+            path = app.config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.sqlite3')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path, app.config.get('CACHE_MAXSIZE', 10000))
+        elif kind == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND {kind!r}')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL')
+        self.lock_timeout = app.config.get('CACHE_LOCK_TIMEOUT', 10)
+
+    @staticmethod
+    def make_key(f, args, kwargs=None):
+        key = f'{f.__module__}.{f.__qualname__}:{args!r}'
+        if kwargs:
+            key += repr(sorted(kwargs.items()))
+        return key
+
+    def get_or_compute(self, key, compute, ttl=None):
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        with self.backend.lock(key, self.lock_timeout):
+            value = self.backend.get(key)
+            if value is not MISSING:
+                # Someone else computed it while we waited.
+                self.coalesced += 1
+                return value
+            value = compute()
+            self.backend.set(key, value, ttl if ttl is not None else self.default_ttl)
+        return value
+
+    def memoize(self, ttl=None):
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                return self.get_or_compute(self.make_key(f, args, kwargs), lambda: f(*args, **kwargs), ttl)
+            wrapper.uncached = f
+            return wrapper
+        return decorator
+
+    def delete_memoized(self, f, *args, **kwargs):
+        self.backend.delete(self.make_key(getattr(f, 'uncached', f), args, kwargs))
+
+    def set(self, key, value, ttl=None):
+        # ttl=0 keeps the value until it is replaced or evicted.
+        self.backend.set(key, value, ttl if ttl is not None else self.default_ttl)
+
+    def version(self, namespace):
+        """Current version of `namespace`. Memoized functions that take it as
+        an argument are invalidated together by bump(namespace)."""
+        value = self.backend.get('version:' + namespace)
+        return 0 if value is MISSING else value
+
+    def bump(self, namespace):
+        self.backend.set('version:' + namespace, time.time_ns(), None)
+
+    def append_log(self, namespace, entry, size=1000):
+        """Append `entry` to the change log of `namespace`, keeping the newest
+        `size` entries, and return its sequence number, which version()
+        then reports. With the SQLite backend the log is shared by all
+        processes, so they can catch up from it instead of recomputing."""
+        # A key that never holds a value, so waiters always take turns.
+        with self.backend.lock('log-lock:' + namespace, self.lock_timeout):
+            log = self.backend.get('log:' + namespace)
+            log = [] if log is MISSING else log
+            seq = max(self.version(namespace), log[-1][0] if log else 0) + 1
+            self.backend.set('log:' + namespace, (log + [(seq, entry)])[-size:], None)
+            self.backend.set('version:' + namespace, seq, None)
+        return seq
+
+    def log_since(self, namespace, version):
+        """(latest sequence number, entries appended after `version`), or None
+        when the log no longer reaches back to `version` (trimmed, evicted
+        or reset)."""
+        log = self.backend.get('log:' + namespace)
+        if log is MISSING or not log or log[0][0] > version + 1 or log[-1][0] < version:
+            return None
+        return log[-1][0], [entry for seq, entry in log if seq > version]
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.backend.evictions,
+        }
+
+
+cache = Cache()
@@ -0,0 +1,173 @@
+"""WSGI middleware that gzip/brotli-compresses text responses.
+
+Responses with a known Content-Length are compressed in one shot (and keep
+a Content-Length); streamed responses without one are compressed chunk by
+chunk with a sync flush, so streamed pages still reach the client as they
+are rendered. Nothing is done for HEAD requests, bodiless statuses
+(204/304/...), bodies under `min_size`, non-text content types, responses
+that already carry a Content-Encoding (e.g. precompressed assets) or
+`Cache-Control: no-transform`.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+def _accepted(header):
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    return accepted
+
+
+class _Gzip(object):
+    def __init__(self, level):
+        # wbits=31: zlib stream with a gzip header and trailer.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli(object):
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware(object):
+    def __init__(self, app, min_size=1024, level=6, brotli_quality=4, types=COMPRESSIBLE_TYPES):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.types = types
+
+    def negotiate(self, environ):
+        accepted = _accepted(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and accepted.get('br', 0) > 0:
+            return 'br'
+        if accepted.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return _Brotli(self.brotli_quality)
+        return _Gzip(self.level)
+
+    def _compressible(self, environ, status, headers):
+        code = int(status.split(None, 1)[0])
+        if environ.get('REQUEST_METHOD') == 'HEAD' or code < 200 or code in (204, 206, 304):
+            return False
+        names = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in names or 'no-transform' in names.get('cache-control', ''):
+            return False
+        if not names.get('content-type', '').startswith(self.types):
+            return False
+        length = names.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        state = {}
+
+        def buffered_start_response(status, headers, exc_info=None):
+            state['args'] = (status, headers, exc_info)
+            return lambda data: state.setdefault('written', []).append(data)
+
+        app_iter = self.app(environ, buffered_start_response)
+        status, headers, exc_info = state['args']
+        if not self._compressible(environ, status, headers):
+            write = start_response(status, headers, exc_info)
+            for data in state.get('written', ()):
+                write(data)
+            return app_iter
+
+        encoding = self.negotiate(environ)
+        headers = self._vary(headers)
+        if encoding is None:
+            start_response(status, headers, exc_info)
+            return self._prepend(state['written'], app_iter) if 'written' in state else app_iter
+
+        compressor = self.compressor(encoding)
+        headers = [
+            (name, 'W/' + value if name.lower() == 'etag' and not value.startswith('W/') else value)
+            for name, value in headers
+        ]
+        headers.append(('Content-Encoding', encoding))
+        chunks = self._prepend(state.get('written', []), app_iter)
+
+        if any(name.lower() == 'content-length' for name, _ in headers):
+            body = compressor.compress(b''.join(chunks)) + compressor.finish()
+            headers = [(n, v) for n, v in headers if n.lower() != 'content-length']
+            headers.append(('Content-Length', str(len(body))))
+            start_response(status, headers, exc_info)
+            return [body]
+
+        start_response(status, headers, exc_info)
+        return self._stream(compressor, chunks)
+
+    @staticmethod
+    def _vary(headers):
+        for i, (name, value) in enumerate(headers):
+            if name.lower() == 'vary':
+                if 'accept-encoding' not in value.lower():
+                    headers = list(headers)
+                    headers[i] = (name, value + ', Accept-Encoding')
+                return headers
+        return list(headers) + [('Vary', 'Accept-Encoding')]
+
+    @staticmethod
+    def _prepend(written, app_iter):
+        try:
+            for data in written:
+                yield data
+            for data in app_iter:
+                yield data
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    @staticmethod
+    def _stream(compressor, chunks):
+        try:
+            for data in chunks:
+                if data:
+                    yield compressor.compress(data) + compressor.flush()
+            yield compressor.finish()
+        finally:
+            chunks.close()
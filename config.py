@@ -16,5 +16,96 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "fyyur")
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+# DATABASE_URL overrides the settings above. DATABASE_URL=sqlite:///:memory:
+# is the in-process profile for tests and quick benchmarks: the schema is
+# created at startup and the data lives as long as the process.
+SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SQLITE_IN_MEMORY = SQLALCHEMY_DATABASE_URI in ("sqlite://", "sqlite:///:memory:")
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# PREPARE the hot queries in model.py on each PostgreSQL connection and run
+# them with EXECUTE (see statements.py). Turn off behind a transaction-mode
+# connection pooler such as PgBouncer.
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "1") == "1"
+
+# Defaults for `flask db upgrade -x online=1` (see migrations/online.py);
+# each can be overridden with -x, e.g. -x lock_timeout=2s.
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+MIGRATION_STATEMENT_TIMEOUT = os.getenv("MIGRATION_STATEMENT_TIMEOUT", "60s")
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 5000))
+MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", 0.1))
+
+# Number of template chunks buffered per write when streaming listing pages.
+TEMPLATE_STREAM_BUFFER = 32
+
+# Persistent Jinja bytecode cache, shared by all workers on the host.
+# Set to an empty string to disable.
+JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", os.path.join(basedir, ".jinja-cache"))
+
+# Import forms, Babel locale data and dateutil at startup instead of on first
+# use. Enable in a preloading master so forked workers share them.
+PRELOAD_MODULES = os.getenv("PRELOAD_MODULES", "") == "1"
+
+# Output of `flask build-assets`: fingerprinted, precompressed static files
+# served from /assets/ with a far-future Cache-Control.
+ASSETS_DIST_DIR = os.path.join(basedir, "static", "dist")
+ASSETS_MAX_AGE = 365 * 24 * 60 * 60
+
+# gzip/brotli compression of text responses (see compression.py).
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Upper bound on the `limit` accepted by /artists/autocomplete and /venues/autocomplete.
+AUTOCOMPLETE_MAX_RESULTS = 50
+# Seconds after which a worker reloads its artist/venue name index in the
+# background (0: never). Writes reach other workers through a change log in
+# the cache, but only with a shared CACHE_BACKEND ("sqlite"); this bounds
+# the lag otherwise.
+AUTOCOMPLETE_MAX_AGE = int(os.getenv("AUTOCOMPLETE_MAX_AGE", 600))
+
+# Optional async read service (asgi.py). Defaults to the database above
+# with the asyncpg driver; set ASYNC_DATABASE_URL for anything else.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+ASYNC_POOL_SIZE = int(os.getenv("ASYNC_POOL_SIZE", 20))
+ASYNC_POOL_OVERFLOW = int(os.getenv("ASYNC_POOL_OVERFLOW", 10))
+
+# Home page feed: entries per list, and how old (seconds) it may get before
+# it is rebuilt in the background. Writes in this process rebuild it sooner.
+HOME_FEED_SIZE = 6
+HOME_FEED_MAX_AGE = 60
+
+# /artists/batch and /venues/batch: max ids per request, and how long
+# clients may reuse a response (seconds).
+BATCH_MAX_IDS = 100
+BATCH_MAX_AGE = 30
+
+# Cache for query helpers and detail pages (see cache.py): "lru" (per
+# process), "sqlite" (shared by all processes on the host) or "null".
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "lru")
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", 30))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 1024))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH")  # default: instance/cache.sqlite3
+CACHE_LOCK_TIMEOUT = 10
+
+# Background refresh jobs (see jobs.py): "thread", "sqlite" (drained by
+# `flask jobs-worker`) or "inline".
+# In-memory SQLite has a single shared connection, so jobs run inline there.
+JOBS_BACKEND = os.getenv("JOBS_BACKEND", "inline" if SQLITE_IN_MEMORY else "thread")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", 2))
+JOBS_MAX_BACKLOG = int(os.getenv("JOBS_MAX_BACKLOG", 1000))
+JOBS_SQLITE_PATH = os.getenv("JOBS_SQLITE_PATH")  # default: instance/jobs.sqlite3
+
+# Admission control (see admission.py): max concurrent requests per worker
+# process for the expensive endpoints, plus a short bounded wait queue.
+# Requests beyond that get a 503 with Retry-After.
+ADMISSION_LIMITS = {
+    "search_venues": 8,
+    "search_artists": 8,
+    "shows": 4,
+    "venues": 4,
+}
+ADMISSION_QUEUE_SIZE = 16
+ADMISSION_QUEUE_TIMEOUT = 0.5  # seconds a queued request may wait for a slot
+ADMISSION_RETRY_AFTER = 1  # seconds, sent in Retry-After
@@ -1,14 +1,45 @@
 from datetime import datetime
 from flask_wtf import FlaskForm as Form
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, URL, ValidationError
+
+class LookupSelectField(SelectField):
+    """Select over an id -> name lookup too large to list (a PrefixIndex).
+
+    Only the selected option is rendered; the page fills in the rest from an
+    autocomplete endpoint as the user types. Submitted ids are checked
+    against the lookup instead of the database.
+    """
+    def __init__(self, label=None, validators=None, placeholder='', message=None, **kwargs):
+        super(LookupSelectField, self).__init__(label, validators, coerce=int, choices=[], **kwargs)
+        self.placeholder = placeholder
+        self.message = message
+        self.lookup = None
+
+    def iter_choices(self):
+        yield ('', self.placeholder, self.data is None, {})
+        name = self.lookup.lookup(self.data) if self.lookup is not None and self.data is not None else None
+        if name is not None:
+            yield (self.data, name, True, {})
+
+    def process_formdata(self, valuelist):
+        if valuelist and valuelist[0] == '':
+            self.data = None
+            return
+        super(LookupSelectField, self).process_formdata(valuelist)
+
+    def pre_validate(self, form):
+        if self.data is not None and self.lookup.lookup(self.data) is None:
+            raise ValidationError(self.message or self.gettext('Not a valid choice.'))
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = LookupSelectField(
+        'artist_id', validators=[DataRequired()],
+        placeholder='Search artists...', message='No such artist.'
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = LookupSelectField(
+        'venue_id', validators=[DataRequired()],
+        placeholder='Search venues...', message='No such venue.'
     )
     start_time = DateTimeField(
         'start_time',
@@ -16,6 +47,12 @@ class ShowForm(Form):
         default= datetime.today()
     )
 
+    def __init__(self, *args, artists=None, venues=None, **kwargs):
+        # artists/venues: the PrefixIndex lookups the ids are checked against.
+        super(ShowForm, self).__init__(*args, **kwargs)
+        self.artist_id.lookup = artists
+        self.venue_id.lookup = venues
+
 class VenueForm(Form):
     name = StringField(
         'name', validators=[DataRequired()]
@@ -0,0 +1,203 @@
+"""Background jobs for derived-data refresh after writes.
+
+Handlers enqueue a registered task by name after their commit and return
+without waiting for it. `jobs = JobQueue()` is bound with
+`jobs.init_app(app)`; JOBS_BACKEND picks where the jobs run:
+
+  "thread"  in-process queue drained by JOBS_WORKERS daemon threads
+  "sqlite"  persistent queue in a local SQLite file, drained by a separate
+            `flask jobs-worker` process (useful with a shared cache)
+  "inline"  run in the caller, e.g. for debugging
+
+Jobs are coalesced by (task, args): enqueueing a job that is already
+waiting is a no-op. The backlog is bounded by JOBS_MAX_BACKLOG; when it is
+full the job runs in the caller instead, so writes are slowed down rather
+than refreshes lost.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import has_app_context
+
+
+class _MemoryStore(object):
+    def __init__(self):
+        self._items = OrderedDict()
+        self._ready = threading.Condition()
+
+    def put(self, key, name, args, enqueued):
+        with self._ready:
+            if key in self._items:
+                return False
+            self._items[key] = (name, args, enqueued)
+            self._ready.notify()
+            return True
+
+    def pop(self, timeout):
+        with self._ready:
+            if not self._items and not self._ready.wait(timeout):
+                return None
+            if not self._items:
+                return None
+            return self._items.popitem(last=False)[1]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _SQLiteStore(object):
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS jobs (key TEXT PRIMARY KEY, name TEXT, args TEXT, enqueued REAL)')
+
+    def _connect(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def put(self, key, name, args, enqueued):
+        return self._connect().execute(
+            'INSERT OR IGNORE INTO jobs (key, name, args, enqueued) VALUES (?, ?, ?, ?)',
+            (key, name, json.dumps(args), enqueued),
+        ).rowcount == 1
+
+    def pop(self, timeout):
+        conn = self._connect()
+        deadline = time.time() + timeout
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT key, name, args, enqueued FROM jobs ORDER BY enqueued LIMIT 1').fetchone()
+                if row is not None:
+                    conn.execute('DELETE FROM jobs WHERE key = ?', (row[0],))
+            finally:
+                conn.execute('COMMIT')
+            if row is not None:
+                return row[1], tuple(json.loads(row[2])), row[3]
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(0.1, timeout))
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+
+class JobQueue(object):
+    def __init__(self, app=None):
+        self.app = None
+        self.tasks = {}
+        self.backend = 'inline'
+        self.store = None
+        self.max_backlog = 1000
+        self.workers = 2
+        self._threads_pid = None
+        self._threads_lock = threading.Lock()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.ran_inline = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.backend = app.config.get('JOBS_BACKEND', 'thread')
+        self.max_backlog = app.config.get('JOBS_MAX_BACKLOG', 1000)
+        self.workers = app.config.get('JOBS_WORKERS', 2)
+        if self.backend == 'thread':
+            self.store = _MemoryStore()
+        elif self.backend == 'sqlite':
+            path = app.config.get('JOBS_SQLITE_PATH') or os.path.join(app.instance_path, 'jobs.sqlite3')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.store = _SQLiteStore(path)
+        elif self.backend == 'inline':
+            self.store = None
+        else:
+            raise ValueError(f'Unknown JOBS_BACKEND {self.backend!r}')
+
+    def task(self, f):
+        self.tasks[f.__name__] = f
+        return f
+
+    def enqueue(self, name, *args):
+        if name not in self.tasks:
+            raise KeyError(f'Unknown job {name!r}')
+        enqueued = time.time()
+        if self.store is None:
+            self._run(name, args, enqueued)
+            return
+        if len(self.store) >= self.max_backlog:
+            self.ran_inline += 1
+            self._run(name, args, enqueued)
+            return
+        if not self.store.put(f'{name}:{args!r}', name, list(args), enqueued):
+            self.coalesced += 1
+            return
+        self.enqueued += 1
+        if self.backend == 'thread':
+            self._ensure_threads()
+
+    def _ensure_threads(self):
+        # Started lazily and per process, so preforked workers get their own.
+        if self._threads_pid == os.getpid():
+            return
+        with self._threads_lock:
+            if self._threads_pid == os.getpid():
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self.work, name=f'jobs-{i}', daemon=True).start()
+            self._threads_pid = os.getpid()
+
+    def _run(self, name, args, enqueued):
+        try:
+            if has_app_context():
+                self.tasks[name](*args)
+            else:
+                with self.app.app_context():
+                    self.tasks[name](*args)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            self.app.logger.exception('Job %s%r failed', name, args)
+        self.latencies.append(time.time() - enqueued)
+
+    def work(self, burst=False, poll_interval=1.0):
+        """Run jobs until stopped, or until the queue is empty if `burst`."""
+        while True:
+            item = self.store.pop(poll_interval)
+            if item is None:
+                if burst:
+                    return
+                continue
+            self._run(*item)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+        return {
+            "backend": self.backend,
+            "depth": len(self.store) if self.store is not None else 0,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "ran_inline": self.ran_inline,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+        }
+
+
+jobs = JobQueue()
@@ -6,6 +6,8 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from alembic.migration import MigrationContext
+from sqlalchemy import text
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -30,6 +32,21 @@ target_metadata = current_app.extensions['migrate'].db.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Online mode for big tables (see migrations/online.py), e.g.
+#   flask db upgrade -x online=1 [-x dry_run=1] [-x lock_timeout=2s]
+# Defaults come from the MIGRATION_* settings in config.py.
+x_args = context.get_x_argument(as_dictionary=True)
+app_config = current_app.config
+online_options = {
+    'enabled': x_args.get('online', '0') == '1',
+    'dry_run': x_args.get('dry_run', '0') == '1',
+    'lock_timeout': x_args.get('lock_timeout', app_config.get('MIGRATION_LOCK_TIMEOUT', '5s')),
+    'statement_timeout': x_args.get('statement_timeout', app_config.get('MIGRATION_STATEMENT_TIMEOUT', '60s')),
+    'batch_size': int(x_args.get('batch_size', app_config.get('MIGRATION_BATCH_SIZE', 5000))),
+    'batch_pause': float(x_args.get('batch_pause', app_config.get('MIGRATION_BATCH_PAUSE', 0.1))),
+}
+config.attributes['online'] = online_options
+
 
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
@@ -73,6 +90,10 @@ def run_migrations_online():
     connectable = current_app.extensions['migrate'].db.engine
 
     with connectable.connect() as connection:
+        if online_options['enabled']:
+            run_migrations_online_mode(connection, process_revision_directives)
+            return
+
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
@@ -84,6 +105,49 @@ def run_migrations_online():
             context.run_migrations()
 
 
+def run_migrations_online_mode(connection, process_revision_directives):
+    """Run migrations without stalling traffic on large tables.
+
+    Each revision gets its own transaction, and every statement runs under
+    lock_timeout (give up rather than queue behind long transactions, which
+    would block everyone queued behind us) and statement_timeout. Steps
+    from migrations/online.py log their progress and estimated row counts.
+
+    With dry_run, pending revisions are rendered as SQL instead of being
+    run, with row estimates taken from the live database.
+    """
+    options = online_options
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("SET lock_timeout = '%s'" % options['lock_timeout']))
+        connection.execute(text("SET statement_timeout = '%s'" % options['statement_timeout']))
+    logger.info('Online mode: lock_timeout=%s statement_timeout=%s batch_size=%d batch_pause=%.2fs%s',
+                options['lock_timeout'], options['statement_timeout'],
+                options['batch_size'], options['batch_pause'],
+                ' (dry run)' if options['dry_run'] else '')
+
+    configure_args = dict(current_app.extensions['migrate'].configure_args)
+    if options['dry_run']:
+        heads = MigrationContext.configure(connection).get_current_heads()
+        config.attributes['online_engine'] = connection.engine
+        configure_args.update(
+            dialect_name=connection.dialect.name,
+            as_sql=True,
+            literal_binds=True,
+            starting_rev=heads[0] if heads else None,
+        )
+    else:
+        configure_args['connection'] = connection
+
+    context.configure(
+        target_metadata=target_metadata,
+        process_revision_directives=process_revision_directives,
+        transaction_per_migration=True,
+        **configure_args
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 if context.is_offline_mode():
     run_migrations_offline()
 else:
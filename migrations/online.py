@@ -0,0 +1,162 @@
+"""Migration helpers for large tables that must stay available.
+
+Use these from a revision's upgrade() instead of the plain `op` calls that
+lock or rewrite a whole table:
+
+    from migrations.online import create_index_concurrently, backfill
+
+    def upgrade():
+        op.add_column('shows', sa.Column('ends_at', sa.DateTime(), nullable=True))
+        backfill('shows', "ends_at = start_time + interval '3 hours'", where='ends_at IS NULL')
+        create_index_concurrently('ix_shows_ends_at', 'shows', ['ends_at'])
+
+and run them in online mode (see env.py):
+
+    flask db upgrade -x online=1               # one transaction per revision, lock/statement timeouts
+    flask db upgrade -x online=1 -x dry_run=1  # print the SQL and estimated rows, change nothing
+
+Index builds and backfill batches run outside the revision's transaction,
+so a revision that fails part-way may leave them done; write them to be
+re-runnable (the helpers below are). Outside PostgreSQL they fall back to
+the plain operations.
+"""
+import logging
+import time
+
+from alembic import context, op
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger('alembic.online')
+
+
+def _options():
+    return context.config.attributes.get('online', {})
+
+
+def _dry_run():
+    return op.get_context().as_sql
+
+
+def _postgresql():
+    return op.get_context().dialect.name == 'postgresql'
+
+
+def estimate_rows(table_name, where=None):
+    """Planner estimate of the rows in `table_name` matching `where`.
+
+    Uses EXPLAIN on PostgreSQL, so it stays cheap on big tables; counts
+    elsewhere. Returns None when there is no database to ask.
+    """
+    if not _dry_run():
+        return _estimate(op.get_bind(), table_name, where)
+    # op.get_bind() only echoes SQL in a dry run; env.py leaves the engine
+    # here. Each estimate gets its own connection, as `where` may refer to
+    # columns an earlier (not executed) step would have added.
+    engine = context.config.attributes.get('online_engine')
+    if engine is None:
+        return None
+    try:
+        with engine.connect() as conn:
+            return _estimate(conn, table_name, where)
+    except DBAPIError:
+        if where is None:
+            raise
+        logger.info('[dry run] cannot evaluate WHERE %s before the earlier steps run; '
+                    'estimating the whole table', where)
+        return estimate_rows(table_name)
+
+
+def _estimate(conn, table_name, where):
+    query = 'SELECT 1 FROM %s' % table_name + (' WHERE %s' % where if where else '')
+    if conn.dialect.name == 'postgresql':
+        plan = conn.execute(text('EXPLAIN (FORMAT JSON) ' + query)).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+    return conn.execute(text('SELECT COUNT(*) FROM (%s) AS q' % query)).scalar()
+
+
+def _step(description, rows):
+    logger.info('%s%s (~%s rows)', '[dry run] ' if _dry_run() else '', description,
+                'unknown' if rows is None else format(rows, ','))
+
+
+def create_index_concurrently(index_name, table_name, columns, **kw):
+    """CREATE INDEX CONCURRENTLY outside the transaction, without blocking writes.
+
+    An INVALID index left behind by an earlier failed attempt is dropped and
+    rebuilt; a valid one with the same name is left alone.
+    """
+    _step('create index %s on %s' % (index_name, table_name), estimate_rows(table_name))
+    if not _postgresql():
+        op.create_index(index_name, table_name, columns, **kw)
+        return
+    ctx = op.get_context()
+    with ctx.autocommit_block():
+        if not _dry_run() and _index_invalid(op.get_bind(), index_name):
+            logger.info('dropping invalid index %s from an earlier attempt', index_name)
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        # The build itself may take a long time; only lock waits are bounded.
+        # Put back the session's own timeout afterwards (outside online mode
+        # there is none to impose).
+        previous = (_options().get('statement_timeout', '0') if _dry_run()
+                    else op.get_bind().execute(text('SHOW statement_timeout')).scalar())
+        op.execute('SET statement_timeout = 0')
+        started = time.monotonic()
+        op.create_index(index_name, table_name, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+        op.execute("SET statement_timeout = '%s'" % previous)
+    if not _dry_run():
+        logger.info('created index %s in %.1f s', index_name, time.monotonic() - started)
+
+
+def drop_index_concurrently(index_name, table_name):
+    _step('drop index %s on %s' % (index_name, table_name), None)
+    if not _postgresql():
+        op.drop_index(index_name, table_name=table_name)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def _index_invalid(conn, index_name):
+    return bool(conn.execute(text(
+        'SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'
+    ), {'name': index_name}).scalar())
+
+
+def backfill(table_name, set_clause, where=None, key='id', batch_size=None, pause=None):
+    """UPDATE `table_name` SET `set_clause` in committed batches of `key` ranges.
+
+    Each batch is its own short transaction, so row locks are held briefly
+    and replicas keep up; `pause` seconds between batches throttles the load.
+    Give a `where` that excludes rows already done so a rerun picks up where
+    a failed one stopped. Defaults for batch_size and pause come from the
+    online-mode options.
+    """
+    options = _options()
+    batch_size = batch_size or int(options.get('batch_size', 5000))
+    pause = float(options.get('batch_pause', 0.1)) if pause is None else pause
+    _step('backfill %s: SET %s%s' % (table_name, set_clause, ' WHERE %s' % where if where else ''),
+          estimate_rows(table_name, where))
+    statement = 'UPDATE %s SET %s WHERE %s >= :low AND %s < :high%s' % (
+        table_name, set_clause, key, key, ' AND (%s)' % where if where else '')
+    if _dry_run():
+        op.execute(text(statement).bindparams(low=0, high=batch_size))
+        logger.info('[dry run] ... repeated for each batch of %d %s values, %.2f s apart', batch_size, key, pause)
+        return
+
+    low, high = op.get_bind().execute(text('SELECT MIN(%s), MAX(%s) FROM %s' % (key, key, table_name))).one()
+    if low is None:
+        logger.info('backfill %s: table is empty', table_name)
+        return
+    updated, started = 0, time.monotonic()
+    with op.get_context().autocommit_block():
+        for start in range(low, high + 1, batch_size):
+            updated += op.get_bind().execute(text(statement), {'low': start, 'high': start + batch_size}).rowcount
+            done = min(start + batch_size, high + 1) - low
+            elapsed = time.monotonic() - started
+            logger.info('backfill %s: %d%% (%s..%s), %s rows updated, %.0f s elapsed, ~%.0f s left',
+                        table_name, done * 100 // (high + 1 - low), start, start + batch_size - 1,
+                        format(updated, ','), elapsed, elapsed / done * (high + 1 - low - done))
+            if pause:
+                time.sleep(pause)
+    logger.info('backfill %s: %s rows updated in %.1f s', table_name, format(updated, ','), time.monotonic() - started)
@@ -1,9 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import and_, bindparam, select
 from datetime import datetime
+from itertools import groupby
+from cache import cache
+from statements import statements
 
 db = SQLAlchemy()
 
+# Native text[] on PostgreSQL, a JSON list everywhere else (e.g. SQLite for
+# tests and quick benchmarks). Either way the attribute is a list of str.
+GenreList = db.JSON().with_variant(ARRAY(db.String()), "postgresql")
+
 class Show(db.Model):
     __tablename__ = "shows"
     id = db.Column(db.Integer, primary_key=True)
@@ -14,14 +22,55 @@ class Show(db.Model):
     venue  = db.relationship("Venue",  back_populates="shows")
 
     @staticmethod
+    @cache.memoize()
     def upcoming_count_for_venue(venue_id, now=None):
-        now = now or datetime.utcnow()
-        return Show.query.filter(Show.venue_id == venue_id, Show.start_time > now).count()
+        return UPCOMING_COUNT_FOR_VENUE.scalar(db.session, venue_id=venue_id, now=now or datetime.utcnow())
 
     @staticmethod
+    @cache.memoize()
     def upcoming_count_for_artist(artist_id, now=None):
+        return UPCOMING_COUNT_FOR_ARTIST.scalar(db.session, artist_id=artist_id, now=now or datetime.utcnow())
+
+    @staticmethod
+    def split_past_upcoming(rows, now=None):
+        # Rows ordered by start time (first column) -> (past newest first, upcoming).
         now = now or datetime.utcnow()
-        return Show.query.filter(Show.artist_id == artist_id, Show.start_time > now).count()
+        past = [row for row in rows if row[0] <= now]
+        return past[::-1], rows[len(past):]
+
+    @staticmethod
+    def for_venue(venue_id):
+        """(start_time, artist_id, artist_name, artist_image_link) rows, oldest first."""
+        return SHOWS_FOR_VENUE.all(db.session, venue_id=venue_id)
+
+    @staticmethod
+    def for_artist(artist_id):
+        """(start_time, venue_id, venue_name, venue_image_link) rows, oldest first."""
+        return SHOWS_FOR_ARTIST.all(db.session, artist_id=artist_id)
+
+    @staticmethod
+    def iter_listing(batch_size=500):
+        # Projected, server-side cursor: rows are fetched in batches while the
+        # template renders, so memory stays flat regardless of table size.
+        rows = (
+            db.session.query(
+                Show.start_time, Venue.id, Venue.name,
+                Artist.id, Artist.name, Artist.image_link,
+            )
+            .join(Venue, Show.venue_id == Venue.id)
+            .join(Artist, Show.artist_id == Artist.id)
+            .order_by(Show.start_time.desc())
+            .yield_per(batch_size)
+        )
+        for start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in rows:
+            yield {
+                "venue_id": venue_id,
+                "venue_name": venue_name,
+                "artist_id": artist_id,
+                "artist_name": artist_name,
+                "artist_image_link": artist_image_link,
+                "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
 
 class Venue(db.Model):
     __tablename__ = "venues"
@@ -36,7 +85,7 @@ class Venue(db.Model):
     website_link = db.Column(db.String(500))
     seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500))
-    genres = db.Column(ARRAY(db.String()), nullable=False)
+    genres = db.Column(GenreList, nullable=False)
     shows = db.relationship("Show", back_populates="venue", cascade="all, delete-orphan")
 
     __table_args__ = (db.UniqueConstraint("name", "city", "state", name="uq_venue_name_city_state"),)
@@ -50,9 +99,72 @@ class Venue(db.Model):
     def by_city_state(city, state):
         return Venue.query.filter_by(city=city, state=state).order_by(Venue.name).all()
 
+    @staticmethod
+    def iter_by_area(now=None, batch_size=500):
+        # One ordered query with upcoming counts, grouped lazily by (city, state).
+        now = now or datetime.utcnow()
+        rows = (
+            db.session.query(Venue.city, Venue.state, Venue.id, Venue.name, db.func.count(Show.id))
+            .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > now))
+            .group_by(Venue.id)
+            .order_by(Venue.city, Venue.state, Venue.name)
+            .yield_per(batch_size)
+        )
+        for (city, state), group in groupby(rows, key=lambda r: (r[0], r[1])):
+            yield {
+                "city": city,
+                "state": state,
+                "venues": (
+                    {"id": venue_id, "name": name, "num_upcoming_shows": upcoming}
+                    for _, _, venue_id, name, upcoming in group
+                ),
+            }
+
     @staticmethod
     def search_by_name(term):
-        return Venue.query.filter(Venue.name.ilike(f"%{term}%")).all()
+        # (id, name) rows
+        return SEARCH_VENUE_NAMES.all(db.session, pattern=f"%{term}%")
+
+    @staticmethod
+    def recent(limit):
+        # Newest listings first; ids are assigned in insert order.
+        rows = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state).order_by(Venue.id.desc()).limit(limit)
+        return [{"id": id, "name": name, "city": city, "state": state} for id, name, city, state in rows]
+
+    @staticmethod
+    def trending(limit, now=None):
+        # Venues with the most upcoming shows.
+        now = now or datetime.utcnow()
+        upcoming = db.func.count(Show.id)
+        rows = (
+            db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, upcoming)
+            .join(Show, and_(Show.venue_id == Venue.id, Show.start_time > now))
+            .group_by(Venue.id)
+            .order_by(upcoming.desc(), Venue.id)
+            .limit(limit)
+        )
+        return [
+            {"id": id, "name": name, "city": city, "state": state, "num_upcoming_shows": count}
+            for id, name, city, state, count in rows
+        ]
+
+    @staticmethod
+    def summaries(ids, now=None):
+        """id -> compact summary for the venues in `ids`, in two queries."""
+        counts = dict(UPCOMING_COUNTS_FOR_VENUES.all(db.session, ids=list(ids), now=now or datetime.utcnow()))
+        return {
+            id: {"id": id, "name": name, "image_link": image_link, "city": city, "state": state,
+                 "num_upcoming_shows": counts.get(id, 0)}
+            for id, name, image_link, city, state in VENUE_SUMMARIES.all(db.session, ids=list(ids))
+        }
+
+    @staticmethod
+    def id_name_pairs():
+        return db.session.query(Venue.id, Venue.name).all()
+
+    @staticmethod
+    def name_for_id(id):
+        return db.session.query(Venue.name).filter(Venue.id == id).scalar()
 
 class Artist(db.Model):
     __tablename__ = "artists"
@@ -66,7 +178,7 @@ class Artist(db.Model):
     website_link = db.Column(db.String(500))
     seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
     seeking_description = db.Column(db.String(500))
-    genres = db.Column(ARRAY(db.String()), nullable=False)
+    genres = db.Column(GenreList, nullable=False)
     shows = db.relationship("Show", back_populates="artist", cascade="all, delete-orphan")
 
     __table_args__ = (db.UniqueConstraint("name", "city", "state", name="uq_artist_name_city_state"),)
@@ -78,10 +190,80 @@ class Artist(db.Model):
 
     @staticmethod
     def search_by_name(term):
-        return Artist.query.filter(Artist.name.ilike(f"%{term}%")).all()
+        # (id, name) rows
+        return SEARCH_ARTIST_NAMES.all(db.session, pattern=f"%{term}%")
+
+    @staticmethod
+    def recent(limit):
+        rows = db.session.query(Artist.id, Artist.name, Artist.city, Artist.state).order_by(Artist.id.desc()).limit(limit)
+        return [{"id": id, "name": name, "city": city, "state": state} for id, name, city, state in rows]
+
+    @staticmethod
+    def summaries(ids, now=None):
+        """id -> compact summary for the artists in `ids`, in two queries."""
+        counts = dict(UPCOMING_COUNTS_FOR_ARTISTS.all(db.session, ids=list(ids), now=now or datetime.utcnow()))
+        return {
+            id: {"id": id, "name": name, "image_link": image_link, "city": city, "state": state,
+                 "num_upcoming_shows": counts.get(id, 0)}
+            for id, name, image_link, city, state in ARTIST_SUMMARIES.all(db.session, ids=list(ids))
+        }
+
+    @staticmethod
+    def id_name_pairs():
+        return db.session.query(Artist.id, Artist.name).all()
+
+    @staticmethod
+    def name_for_id(id):
+        return db.session.query(Artist.name).filter(Artist.id == id).scalar()
 
     def past_and_upcoming_shows(self, now=None):
         now = now or datetime.utcnow()
         past = Show.query.filter(Show.artist_id == self.id, Show.start_time <= now).order_by(Show.start_time.desc()).all()
         upcoming = Show.query.filter(Show.artist_id == self.id, Show.start_time > now).order_by(Show.start_time.asc()).all()
         return past, upcoming
+
+# ---- Hot statements (see statements.py) ----
+UPCOMING_COUNT_FOR_VENUE = statements.define("upcoming_count_for_venue", (
+    select(db.func.count(Show.id))
+    .where(Show.venue_id == bindparam("venue_id"), Show.start_time > bindparam("now"))
+))
+UPCOMING_COUNT_FOR_ARTIST = statements.define("upcoming_count_for_artist", (
+    select(db.func.count(Show.id))
+    .where(Show.artist_id == bindparam("artist_id"), Show.start_time > bindparam("now"))
+))
+SHOWS_FOR_VENUE = statements.define("shows_for_venue", (
+    select(Show.start_time, Artist.id, Artist.name, Artist.image_link)
+    .join(Artist, Show.artist_id == Artist.id)
+    .where(Show.venue_id == bindparam("venue_id"))
+    .order_by(Show.start_time)
+))
+SHOWS_FOR_ARTIST = statements.define("shows_for_artist", (
+    select(Show.start_time, Venue.id, Venue.name, Venue.image_link)
+    .join(Venue, Show.venue_id == Venue.id)
+    .where(Show.artist_id == bindparam("artist_id"))
+    .order_by(Show.start_time)
+))
+SEARCH_VENUE_NAMES = statements.define("search_venue_names", (
+    select(Venue.id, Venue.name).where(Venue.name.ilike(bindparam("pattern")))
+))
+SEARCH_ARTIST_NAMES = statements.define("search_artist_names", (
+    select(Artist.id, Artist.name).where(Artist.name.ilike(bindparam("pattern")))
+))
+VENUE_SUMMARIES = statements.define("venue_summaries", (
+    select(Venue.id, Venue.name, Venue.image_link, Venue.city, Venue.state)
+    .where(Venue.id.in_(bindparam("ids", expanding=True)))
+), prepare=False)
+ARTIST_SUMMARIES = statements.define("artist_summaries", (
+    select(Artist.id, Artist.name, Artist.image_link, Artist.city, Artist.state)
+    .where(Artist.id.in_(bindparam("ids", expanding=True)))
+), prepare=False)
+UPCOMING_COUNTS_FOR_VENUES = statements.define("upcoming_counts_for_venues", (
+    select(Show.venue_id, db.func.count(Show.id))
+    .where(Show.venue_id.in_(bindparam("ids", expanding=True)), Show.start_time > bindparam("now"))
+    .group_by(Show.venue_id)
+), prepare=False)
+UPCOMING_COUNTS_FOR_ARTISTS = statements.define("upcoming_counts_for_artists", (
+    select(Show.artist_id, db.func.count(Show.id))
+    .where(Show.artist_id.in_(bindparam("ids", expanding=True)), Show.start_time > bindparam("now"))
+    .group_by(Show.artist_id)
+), prepare=False)
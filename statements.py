@@ -0,0 +1,98 @@
+"""Hot queries defined once as prepared statements.
+
+`statements.define(name, stmt)` takes a Core select built once at import
+time with named `bindparam`s, so requests skip building the statement and
+SQLAlchemy compiles it once into its compiled cache.
+
+On PostgreSQL with DB_PREPARED_STATEMENTS enabled the statement is also
+PREPAREd on the server, once per pooled connection, and run with EXECUTE,
+so the server parses it once and can reuse its plan (except for statements
+defined with prepare=False, e.g. with expanding IN lists, whose shape
+changes with the list length). psycopg2 has no
+protocol-level prepare, hence the explicit PREPARE. Leave it off behind a
+transaction-pooling proxy (e.g. PgBouncer in transaction mode), where
+consecutive transactions may land on different server connections.
+"""
+import re
+
+_PYFORMAT_PARAM = re.compile(r'%\((\w+)\)s')
+
+
+class Statement(object):
+    def __init__(self, registry, name, stmt, prepare=True):
+        self.registry = registry
+        self.name = name
+        self.stmt = stmt
+        self.prepare = prepare
+        self._prepare_sql = None
+        self._param_names = None
+
+    def _compile_for_prepare(self, dialect):
+        # psycopg2 compiles to %(name)s; PREPARE wants $1, $2, ...
+        if self._prepare_sql is None:
+            compiled = str(self.stmt.compile(dialect=dialect))
+            names = []
+
+            def number(match):
+                if match.group(1) not in names:
+                    names.append(match.group(1))
+                return '$%d' % (names.index(match.group(1)) + 1)
+
+            self._prepare_sql = 'PREPARE %s AS %s' % (self.name, _PYFORMAT_PARAM.sub(number, compiled).replace('%%', '%'))
+            self._param_names = names
+        return self._prepare_sql, self._param_names
+
+    def execute(self, session, **params):
+        self.registry.executions += 1
+        conn = session.connection()
+        if not (self.prepare and self.registry.server_side) or conn.dialect.name != 'postgresql':
+            return session.execute(self.stmt, params)
+        sql, names = self._compile_for_prepare(conn.dialect)
+        # `info` belongs to the pooled DBAPI connection and is reset when
+        # that connection is replaced, along with its prepared statements.
+        prepared = conn.connection.info.setdefault('prepared_statements', set())
+        if self.name not in prepared:
+            conn.exec_driver_sql(sql)
+            prepared.add(self.name)
+            self.registry.prepares += 1
+        placeholders = ', '.join('%%(%s)s' % name for name in names)
+        return conn.exec_driver_sql(
+            'EXECUTE %s (%s)' % (self.name, placeholders) if names else 'EXECUTE %s' % self.name,
+            {name: params[name] for name in names},
+        )
+
+    def all(self, session, **params):
+        return self.execute(session, **params).all()
+
+    def scalar(self, session, **params):
+        return self.execute(session, **params).scalar()
+
+
+class Statements(object):
+    def __init__(self, app=None):
+        self.server_side = False
+        self.registered = {}
+        self.executions = 0
+        self.prepares = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.server_side = app.config.get('DB_PREPARED_STATEMENTS', False)
+
+    def define(self, name, stmt, prepare=True):
+        if name in self.registered:
+            raise ValueError(f'Statement {name!r} is already defined')
+        self.registered[name] = Statement(self, name, stmt, prepare)
+        return self.registered[name]
+
+    def stats(self):
+        return {
+            "server_side": self.server_side,
+            "statements": len(self.registered),
+            "executions": self.executions,
+            "prepares": self.prepares,
+        }
+
+
+statements = Statements()
@@ -2,3 +2,32 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Searchable selects: <select data-search-url="..."> only ships the selected
+// option; a text box above it fills in matches from the autocomplete endpoint.
+$(function () {
+  $('select[data-search-url]').each(function () {
+    var select = $(this);
+    var placeholder = select.find('option[value=""]').first().clone();
+    var search = $('<input type="search" class="form-control" autocomplete="off">')
+      .attr('placeholder', placeholder.text())
+      .insertBefore(select);
+    var timer = null;
+    var latest = 0;
+
+    search.on('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var request = ++latest;
+        $.getJSON(select.data('search-url'), { q: search.val(), limit: 20 }, function (response) {
+          if (request !== latest) { return; }
+          select.empty().append(placeholder.clone());
+          $.each(response.data, function (_, item) {
+            select.append($('<option>').val(item.id).text(item.name));
+          });
+          select.val(response.data.length ? String(response.data[0].id) : '');
+        });
+      }, 150);
+    });
+  });
+});
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# The in-memory SQLite profile (config.py): schema created at import, inline jobs.
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    from app import app, artist_names, venue_names
+    from cache import cache
+    from model import db
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        cache.clear()
+        for index in (artist_names, venue_names):
+            index.built, index.builds = False, 0
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+
+def seed_shows(count):
+    from model import db, Artist, Show, Venue
+    artist = Artist(name='Band', city='Austin', state='TX', genres=['Jazz'])
+    venue = Venue(name='Hall', city='Austin', state='TX', address='1 Main St', genres=['Jazz'])
+    db.session.add_all([artist, venue])
+    db.session.flush()
+    start = datetime(2030, 1, 1)
+    db.session.add_all([
+        Show(artist_id=artist.id, venue_id=venue.id, start_time=start + timedelta(hours=i)) for i in range(count)
+    ])
+    db.session.commit()
+
+
+def test_early_close_of_streamed_page_frees_the_slot(app, client):
+    from admission import admission
+    seed_shows(200)
+    gate = admission.gates['shows']
+
+    for _ in range(gate.limit + 1):
+        response = client.get('/shows', buffered=False)
+        assert response.status_code == 200
+        next(iter(response.response))
+        assert gate.active == 1
+        response.close()  # client went away mid-stream
+        assert gate.active == 0
+
+    response = client.get('/shows')
+    assert response.status_code == 200
+    response.close()  # as the WSGI server does after the last chunk
+    assert gate.active == 0
@@ -0,0 +1,127 @@
+from autocomplete import PrefixIndex
+
+
+def make_index(names):
+    return PrefixIndex(lambda: list(enumerate(names, 1)))
+
+
+def test_search_caps_results_at_limit():
+    index = make_index(['Band %d' % i for i in range(20)])
+    assert len(index.search('band', 5)) == 5
+
+
+def test_search_with_non_positive_limit_returns_nothing():
+    index = make_index(['Band %d' % i for i in range(20)])
+    assert index.search('band', 0) == []
+    assert index.search('band', -1) == []
+
+
+def test_autocomplete_endpoint_clamps_negative_limit(app, client):
+    from model import db, Artist
+    for i in range(60):
+        db.session.add(Artist(name='Band %d' % i, city='Austin', state='TX', genres=['Jazz']))
+    db.session.commit()
+
+    response = client.get('/artists/autocomplete?q=b&limit=-1')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 1
+
+    response = client.get('/artists/autocomplete?q=b&limit=1000')
+    assert len(response.get_json()['data']) == app.config['AUTOCOMPLETE_MAX_RESULTS']
+
+
+def shared_cache():
+    from cache import Cache, LRUBackend
+    cache = Cache()
+    cache.backend = LRUBackend()
+    return cache
+
+
+def test_local_writes_do_not_reload_the_index(app, client):
+    from app import artist_names
+    artist_names.ensure_built()
+    for name in ('Alpha', 'Beta', 'Gamma'):
+        response = client.post('/artists/create', data={
+            'name': name, 'city': 'Austin', 'state': 'TX', 'phone': '512-555-0100', 'genres': ['Jazz'],
+            'facebook_link': 'https://facebook.com/%s' % name.lower(),
+        })
+        assert response.status_code == 302
+    assert [row['name'] for row in client.get('/artists/autocomplete?q=g').get_json()['data']] == ['Gamma']
+    assert artist_names.builds == 1
+
+
+def test_other_processes_catch_up_from_the_changelog():
+    from autocomplete import ChangeLog
+    cache = shared_cache()
+    names = {1: 'Alpha', 2: 'Beta'}
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return list(names.items())
+
+    writer = PrefixIndex(loader, changelog=ChangeLog(cache, 'names'))
+    reader = PrefixIndex(loader, changelog=ChangeLog(cache, 'names'))
+    writer.ensure_built()
+    reader.ensure_built()
+
+    names[3] = 'Gamma'
+    writer.add(3, 'Gamma')
+    writer.publish()
+    names[1] = 'Alphonse'
+    writer.add(1, 'Alphonse')
+    writer.publish()
+    del names[2]
+    writer.remove(2)
+    writer.publish()
+
+    assert reader.search('g') == [{'id': 3, 'name': 'Gamma'}]
+    assert reader.lookup(1) == 'Alphonse'
+    assert reader.lookup(2) is None
+    writer.ensure_built()
+    assert len(loads) == 2
+
+
+def test_gap_in_the_changelog_reloads_the_index():
+    from autocomplete import ChangeLog
+    cache = shared_cache()
+    names = {1: 'Alpha'}
+    reader = PrefixIndex(lambda: list(names.items()), changelog=ChangeLog(cache, 'names', size=2),
+                         spawn=lambda build: build())
+    reader.ensure_built()
+    writer = ChangeLog(cache, 'names', size=2)
+    for id, name in ((2, 'Beta'), (3, 'Gamma'), (4, 'Delta')):
+        names[id] = name
+        writer.append(id, name)
+
+    assert reader.search('b') == [{'id': 2, 'name': 'Beta'}]
+    assert reader.builds == 2
+
+
+def test_lookup_misses_are_remembered():
+    fetched = []
+
+    def fetch(id):
+        fetched.append(id)
+        return None
+
+    index = PrefixIndex(lambda: [(1, 'Alpha')], fetch=fetch)
+    assert index.lookup(99) is None
+    assert index.lookup(99) is None
+    assert fetched == [99]
+    index.add(99, 'Omega')
+    assert index.lookup(99) == 'Omega'
+
+
+def test_publish_before_the_writer_has_built_its_index():
+    from autocomplete import ChangeLog
+    cache = shared_cache()
+    names = {1: 'Alpha'}
+    reader = PrefixIndex(lambda: list(names.items()), changelog=ChangeLog(cache, 'names'))
+    writer = PrefixIndex(lambda: list(names.items()), changelog=ChangeLog(cache, 'names'))
+    reader.ensure_built()
+
+    names[1] = 'Alphonse'
+    writer.add(1, 'Alphonse')
+    writer.publish()
+    assert reader.lookup(1) == 'Alphonse'